@@ -1,6 +1,6 @@
 from kiteconnect import KiteConnect
 import os
-import csv
+from instrument_index import InstrumentRefresher
 
 # Your credentials
 api_key = " "
@@ -9,6 +9,10 @@ access_token_file = "access_token.txt"
 
 kite = KiteConnect(api_key=api_key)
 
+# Instrument dumps used for token lookups, loaded on first use
+INSTRUMENT_EXCHANGES = ["NSE", "BSE", "NFO", "CDS"]
+instrument_refresher = None
+
 def get_instrument_token(exchange, trading_symbol):
     """
     Get the instrument token for a given exchange and trading symbol.
@@ -20,27 +24,19 @@ def get_instrument_token(exchange, trading_symbol):
     Returns:
         int or None: Instrument token if found, None otherwise
     """
+    global instrument_refresher
     try:
-        with open('instruments.csv', 'r') as file:
-            csv_reader = csv.reader(file)
-            next(csv_reader)  # Skip header row
-            
-            for row in csv_reader:
-                if len(row) >= 12:  # Ensure row has enough columns
-                    # Check if exchange and trading symbol match
-                    if row[11] == exchange and row[2] == trading_symbol:
-                        instrument_token = int(row[0])
-                        print(f"Found instrument token: {instrument_token} for {trading_symbol} on {exchange}")
-                        return instrument_token
-            
+        if instrument_refresher is None:
+            # Loads instruments_<EXCHANGE>.csv, downloading any missing or stale dump first
+            instrument_refresher = InstrumentRefresher(INSTRUMENT_EXCHANGES).start(wait=True)
+        instrument_token = instrument_refresher.index.token(exchange, trading_symbol)
+        if instrument_token is None:
             print(f"No instrument found for {trading_symbol} on {exchange}")
             return None
-            
-    except FileNotFoundError:
-        print("instruments.csv file not found")
-        return None
+        print(f"Found instrument token: {instrument_token} for {trading_symbol} on {exchange}")
+        return instrument_token
     except Exception as e:
-        print(f"Error reading instruments.csv: {e}")
+        print(f"Error loading instruments: {e}")
         return None
 
 def set_access_token_from_file():
@@ -67,7 +63,7 @@ if not set_access_token_from_file():
         f.write(access_token)
     print("Access token saved to access_token.txt")
 
-def place_order(symbol, direction, quantity, product=None):
+def place_order(symbol, direction, quantity, product=None, quote_cache=None):
     # Automatically detect exchange based on symbol
     if any(char.isdigit() for char in symbol):
         # Check if it's CDS (Currency Derivatives) first
@@ -97,7 +93,7 @@ def place_order(symbol, direction, quantity, product=None):
     try:
         # Get quote for the symbol
         quote_symbol = f"{exchange}:{symbol}"
-        quotes = kite.quote(quote_symbol)
+        quotes = (quote_cache or kite).quote(quote_symbol)
         
         if direction == "BUY":
             # For BUY order, use best bid price (what buyers are willing to pay)
@@ -131,12 +127,13 @@ def place_order(symbol, direction, quantity, product=None):
         return None
 
 
-def get_quote(*args, order_type="BUY"):
+def get_quote(*args, order_type="BUY", quote_cache=None):
     """
     Get best quote for trading
     Args:
         args: Instrument symbols (exchange, symbol pairs OR full format)
         order_type: "BUY" (best ask), "SELL" (best bid) - defaults to "BUY"
+        quote_cache: Optional QuoteCache to reuse quotes fetched in the last few hundred ms
     Returns:
         Best prices for trading
     """
@@ -156,7 +153,7 @@ def get_quote(*args, order_type="BUY"):
                 stock = args[i + 1]
                 symbols.append(f"{exchange}:{stock}")
             
-        quotes = kite.quote(*symbols)
+        quotes = (quote_cache or kite).quote(*symbols)
         result = {}
         
         for symbol, data in quotes.items():
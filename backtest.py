@@ -0,0 +1,227 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from option_chain import atm_strike, strike_step
+from order_pricing import PASSIVE_SIDE
+
+
+def _passive_prices(bid, ask, direction):
+    # Same rule as order_pricing.limit_price(), applied to whole arrays
+    return bid if PASSIVE_SIDE[direction] == "buy" else ask
+
+
+def atm_strikes_for_bars(spot_close, chain_strikes):
+    """
+    ATM strike for every bar of an underlying, using the step of its option chain.
+
+    Args:
+        spot_close: Array of spot closes
+        chain_strikes: Strikes listed in the option chain
+
+    Returns:
+        ndarray: ATM strike per bar
+    """
+    return atm_strike(spot_close, strike_step(chain_strikes))
+
+
+def backtest_bars(bars, signals, direction, quantity, half_spread=0.05, valid_bars=1):
+    """
+    Vectorized bar-level replay of the passive limit order rule.
+
+    At every bar where signals is True an order is priced off a synthetic
+    top of book (close -/+ half_spread) with the same BUY-at-bid / SELL-at-ask
+    rule as place_order(). It fills at the limit if the low (BUY) or high
+    (SELL) of one of the next valid_bars bars trades through it.
+
+    Args:
+        bars (DataFrame): Candles with date, high, low, close columns
+        signals: Boolean array, one entry per bar
+        direction (str): 'BUY' or 'SELL'
+        quantity (int): Order quantity
+        half_spread (float): Half of the assumed bid-ask spread, in price units
+        valid_bars (int): Number of bars an order rests before it is cancelled
+
+    Returns:
+        DataFrame: One row per order with limit price, fill bar, fill flag and P&L to last close
+    """
+    high = bars["high"].to_numpy(dtype=float)
+    low = bars["low"].to_numpy(dtype=float)
+    close = bars["close"].to_numpy(dtype=float)
+    n = len(close)
+    placed = np.flatnonzero(np.asarray(signals, dtype=bool))
+
+    limit = _passive_prices(close - half_spread, close + half_spread, direction)[placed]
+
+    # offsets[i, k] is bar placed[i] + 1 + k; bars past the end never trade
+    offsets = placed[:, None] + 1 + np.arange(valid_bars)[None, :]
+    inside = offsets < n
+    offsets = np.minimum(offsets, n - 1)
+    if direction == "BUY":
+        crossed = (low[offsets] <= limit[:, None]) & inside
+    else:
+        crossed = (high[offsets] >= limit[:, None]) & inside
+    filled = crossed.any(axis=1)
+    fill_bar = np.where(filled, offsets[np.arange(len(placed)), crossed.argmax(axis=1)], -1)
+
+    sign = 1 if direction == "BUY" else -1
+    pnl = np.where(filled, sign * (close[-1] - limit) * quantity, 0.0) if n else np.zeros(0)
+    dates = bars["date"].reset_index(drop=True)
+    return pd.DataFrame({
+        "placed_at": dates.iloc[placed].to_numpy(),
+        "limit_price": limit,
+        "filled": filled,
+        "filled_at": dates.iloc[np.maximum(fill_bar, 0)].reset_index(drop=True).where(filled),
+        "pnl": pnl,
+    })
+
+
+class DepthReplay:
+    """
+    Event-driven replay of recorded top-of-book ticks with a queue-position fill model.
+
+    Ticks need timestamp, instrument_token, last_price, volume (cumulative, as
+    in Kite ticks), bid, bid_qty, ask, ask_qty. They are split per instrument
+    into numpy arrays once; orders are then processed as events in time order.
+
+    An order is priced with the passive rule off the last tick at or before it
+    and joins the back of the queue at that level. It fills when the volume
+    traded at or through the limit exceeds the queue ahead plus its own size,
+    or when the opposite side of the book moves onto the limit.
+    """
+
+    def __init__(self, ticks):
+        ticks = ticks.sort_values(["instrument_token", "timestamp"], kind="stable")
+        tokens = ticks["instrument_token"].to_numpy()
+        bounds = np.flatnonzero(np.diff(tokens)) + 1
+        starts = np.concatenate([[0], bounds])
+        ends = np.concatenate([bounds, [len(tokens)]])
+
+        ts = pd.to_datetime(ticks["timestamp"]).to_numpy().astype("datetime64[ns]").view("int64")
+        columns = {c: ticks[c].to_numpy(dtype=float) for c in ["last_price", "volume", "bid", "bid_qty", "ask", "ask_qty"]}
+        self.books = {}
+        for start, end in zip(starts, ends):
+            book = {c: values[start:end] for c, values in columns.items()}
+            book["ts"] = ts[start:end]
+            traded = np.diff(book["volume"], prepend=book["volume"][0])
+            book["traded"] = np.maximum(traded, 0)  # volume resets between sessions
+            self.books[int(tokens[start])] = book
+
+    def _fill_index(self, book, i0, limit, direction, needed, stop):
+        # Scan forward in growing chunks so short-lived orders stay cheap on long days
+        chunk = 256
+        cum = 0.0
+        j = i0 + 1
+        while j < stop:
+            k = min(j + chunk, stop)
+            if direction == "BUY":
+                through = book["last_price"][j:k] <= limit
+                crossed = book["ask"][j:k] <= limit
+            else:
+                through = book["last_price"][j:k] >= limit
+                crossed = book["bid"][j:k] >= limit
+            traded = cum + np.cumsum(book["traded"][j:k] * through)
+            hit = (traded >= needed) | crossed
+            if hit.any():
+                return j + int(hit.argmax())
+            cum = traded[-1]
+            j = k
+            chunk *= 4
+        return -1
+
+    def run(self, orders, valid_for=None):
+        """
+        Replay orders against the recorded book.
+
+        Args:
+            orders (DataFrame): timestamp, instrument_token, direction, quantity
+            valid_for (float): Seconds an order rests before cancellation, None for the whole replay
+
+        Returns:
+            DataFrame: The orders with limit_price, filled, filled_at and latency columns added
+        """
+        orders = orders.sort_values("timestamp", kind="stable").reset_index(drop=True)
+        order_ts = pd.to_datetime(orders["timestamp"]).to_numpy().astype("datetime64[ns]").view("int64")
+        limit = np.full(len(orders), np.nan)
+        filled_ts = np.full(len(orders), np.iinfo(np.int64).min)
+
+        for n, (token, direction, quantity) in enumerate(
+                zip(orders["instrument_token"], orders["direction"], orders["quantity"])):
+            book = self.books.get(int(token))
+            if book is None:
+                continue
+            ts = book["ts"]
+            i0 = int(np.searchsorted(ts, order_ts[n], side="right")) - 1
+            if i0 < 0:
+                continue
+            limit[n] = _passive_prices(book["bid"][i0], book["ask"][i0], direction)
+            queue_ahead = book["bid_qty"][i0] if direction == "BUY" else book["ask_qty"][i0]
+            stop = len(ts)
+            if valid_for is not None:
+                stop = int(np.searchsorted(ts, order_ts[n] + int(valid_for * 1e9), side="right"))
+            j = self._fill_index(book, i0, limit[n], direction, queue_ahead + quantity, stop)
+            if j >= 0:
+                filled_ts[n] = ts[j]
+
+        filled = filled_ts != np.iinfo(np.int64).min
+        orders["limit_price"] = limit
+        orders["filled"] = filled
+        orders["filled_at"] = pd.to_datetime(np.where(filled, filled_ts, np.iinfo(np.int64).min))
+        orders["latency"] = orders["filled_at"] - pd.to_datetime(orders["timestamp"])
+        return orders
+
+
+def synthetic_ticks(n_ticks, n_instruments=50, seed=0):
+    """
+    Random-walk top-of-book ticks for benchmarking, spread over one trading month.
+    """
+    rng = np.random.default_rng(seed)
+    tokens = rng.integers(0, n_instruments, n_ticks)
+    start = np.datetime64("2025-01-01T09:15:00", "ns").view("int64")
+    span = int(20 * 6.25 * 3600 * 1e9)
+    ts = np.sort(rng.integers(start, start + span, n_ticks))
+    mid = 200 + np.cumsum(rng.normal(0, 0.05, n_ticks))
+    mid = np.round(np.abs(mid) / 0.05) * 0.05 + 0.05
+    return pd.DataFrame({
+        "timestamp": ts.view("datetime64[ns]"),
+        "instrument_token": tokens,
+        "last_price": mid + rng.choice([-0.05, 0.0, 0.05], n_ticks),
+        "volume": np.cumsum(rng.integers(0, 500, n_ticks)),
+        "bid": mid - 0.05,
+        "bid_qty": rng.integers(15, 3000, n_ticks),
+        "ask": mid + 0.05,
+        "ask_qty": rng.integers(15, 3000, n_ticks),
+    })
+
+
+def benchmark(n_ticks=5_000_000, n_orders=10_000, valid_for=300):
+    """
+    Time a depth replay over synthetic ticks and print throughput.
+    """
+    ticks = synthetic_ticks(n_ticks)
+    rng = np.random.default_rng(1)
+    orders = pd.DataFrame({
+        "timestamp": rng.choice(ticks["timestamp"].to_numpy(), n_orders),
+        "instrument_token": rng.integers(0, 50, n_orders),
+        "direction": rng.choice(["BUY", "SELL"], n_orders),
+        "quantity": 15 * rng.integers(1, 10, n_orders),
+    })
+
+    t0 = time.perf_counter()
+    replay = DepthReplay(ticks)
+    t1 = time.perf_counter()
+    result = replay.run(orders, valid_for=valid_for)
+    t2 = time.perf_counter()
+    print(f"Loaded {n_ticks:,} ticks in {t1 - t0:.2f}s, replayed {n_orders:,} orders in {t2 - t1:.2f}s "
+          f"({n_ticks / (t2 - t0):,.0f} ticks/s), fill rate {result['filled'].mean():.1%}")
+    return result
+
+
+if __name__ == "__main__":
+    benchmark()
+
+# Usage:
+# candles = HistoricalStore(kite).get([token], "minute", start)[token]   # see historical_data.py
+# trades = backtest_bars(candles, candles["close"] < candles["close"].rolling(20).mean(), "BUY", 15)
+# fills = DepthReplay(recorded_ticks).run(orders, valid_for=60)
@@ -0,0 +1,117 @@
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from order_intake import SheetIntake, SpoolIntake, SocketIntake, run_intake
+
+# Measures submit -> handler latency for each intake backend with a no-op
+# handler, i.e. the time an order spends before it reaches the place_order path.
+# The sheet backend needs credentials, so it is modelled from its poll interval
+# plus a typical Sheets API read instead of being measured. The spool backend
+# is measured at its defaults (inotify if inotify_simple is installed, else a
+# 10ms directory scan) and again with a 1ms scan.
+
+N_ORDERS = 200
+BENCH_TOKEN = "bench-token"
+SHEETS_API_READ_SECONDS = 0.4
+
+
+def _collector():
+    received = {}
+    event = threading.Event()
+
+    def handler(intake, batch):
+        now = time.perf_counter()
+        for order in batch.orders:
+            received[order.symbol] = now
+        event.set()
+
+    return received, handler
+
+
+def _summary(name, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<22} n={len(latencies):<5} mean={statistics.mean(latencies) * 1000:9.3f} ms  "
+          f"p50={statistics.median(latencies) * 1000:9.3f} ms  p99={p99 * 1000:9.3f} ms")
+
+
+def _wait_for(received, symbol, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while symbol not in received and time.perf_counter() < deadline:
+        time.sleep(0.0001)
+    return received.get(symbol)
+
+
+def bench_spool(n=N_ORDERS, poll_every=None):
+    with tempfile.TemporaryDirectory() as directory:
+        intake = SpoolIntake(directory) if poll_every is None else SpoolIntake(directory, poll_every=poll_every)
+        mode = "inotify" if intake.wake_mode == "inotify" else f"{intake.poll_every * 1000:g}ms scan"
+        received, handler = _collector()
+        stop = threading.Event()
+        worker = threading.Thread(target=run_intake, args=(intake, handler, stop), daemon=True)
+        worker.start()
+        latencies = []
+        for i in range(n):
+            symbol = f"SPOOL{i}"
+            tmp = os.path.join(directory, f".order{i}.tmp")
+            with open(tmp, "w") as f:
+                f.write(f'{{"symbol": "{symbol}", "direction": "BUY", "quantity": 1}}\n')
+            sent = time.perf_counter()
+            os.replace(tmp, os.path.join(directory, f"order{i}.jsonl"))
+            got = _wait_for(received, symbol)
+            if got is not None:
+                latencies.append(got - sent)
+        stop.set()
+        worker.join()
+        intake.close()
+    _summary(f"spool ({mode})", latencies)
+
+
+def bench_socket(n=N_ORDERS):
+    with tempfile.TemporaryDirectory() as directory:
+        intake = SocketIntake(BENCH_TOKEN, path=os.path.join(directory, "orders.sock"))
+        received, handler = _collector()
+        stop = threading.Event()
+        threading.Thread(target=run_intake, args=(intake, handler, stop), daemon=True).start()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.connect(intake.address)
+            conn.sendall(f"AUTH {BENCH_TOKEN}\n".encode("utf-8"))
+            latencies = _send_orders(conn, received, n)
+        stop.set()
+        intake.close()
+    _summary("socket (unix)", latencies)
+
+
+def _send_orders(conn, received, n):
+    latencies = []
+    for i in range(n):
+        symbol = f"SOCK{i}"
+        sent = time.perf_counter()
+        conn.sendall(f"{symbol},BUY,1\n".encode("utf-8"))
+        got = _wait_for(received, symbol)
+        if got is not None:
+            latencies.append(got - sent)
+    return latencies
+
+
+def model_sheet():
+    # An order lands at a uniformly random point of the poll interval
+    interval = SheetIntake.poll_interval
+    mean = interval / 2 + SHEETS_API_READ_SECONDS
+    worst = interval + SHEETS_API_READ_SECONDS
+    print(f"{'sheet (modelled)':<22} mean={mean * 1000:9.0f} ms  worst={worst * 1000:9.0f} ms  "
+          f"({interval}s poll + ~{SHEETS_API_READ_SECONDS * 1000:.0f} ms Sheets read)")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else N_ORDERS
+    print(f"Order intake latency, submit -> handler, {n} orders one at a time")
+    bench_socket(n)
+    bench_spool(n)
+    bench_spool(n, poll_every=0.001)
+    model_sheet()
@@ -0,0 +1,292 @@
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Kite reads historical from/to dates as exchange (IST) wall-clock time
+IST = ZoneInfo("Asia/Kolkata")
+
+# Longest date range Kite returns in a single historical_data() call, per interval
+MAX_DAYS_PER_REQUEST = {
+    "minute": 60,
+    "3minute": 100,
+    "5minute": 100,
+    "10minute": 100,
+    "15minute": 200,
+    "30minute": 200,
+    "60minute": 400,
+    "day": 2000,
+}
+
+# Length of one candle. Candles are stamped with their start time, so any
+# candle starting more than one length before now is complete.
+CANDLE_LENGTH = {
+    "minute": datetime.timedelta(minutes=1),
+    "3minute": datetime.timedelta(minutes=3),
+    "5minute": datetime.timedelta(minutes=5),
+    "10minute": datetime.timedelta(minutes=10),
+    "15minute": datetime.timedelta(minutes=15),
+    "30minute": datetime.timedelta(minutes=30),
+    "60minute": datetime.timedelta(minutes=60),
+    "day": datetime.timedelta(days=1),
+}
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter shared by worker threads.
+
+    Args:
+        rate (float): Requests allowed per second (Kite allows 3/s for historical data)
+        burst (int): Requests allowed back to back before throttling kicks in
+    """
+
+    def __init__(self, rate=3.0, burst=3):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def split_range(from_date, to_date, interval):
+    """
+    Split [from_date, to_date] into windows no longer than Kite allows for the interval.
+
+    Returns:
+        list: (window_start, window_end) datetime tuples
+    """
+    max_span = datetime.timedelta(days=MAX_DAYS_PER_REQUEST[interval])
+    windows = []
+    start = from_date
+    while start < to_date:
+        end = min(start + max_span, to_date)
+        windows.append((start, end))
+        start = end
+    return windows
+
+
+def missing_ranges(covered, from_date, to_date):
+    """
+    Get the parts of [from_date, to_date] not already covered.
+
+    Args:
+        covered (list): Sorted, non-overlapping (start, end) datetime tuples
+        from_date (datetime): Start of the requested range
+        to_date (datetime): End of the requested range
+
+    Returns:
+        list: (start, end) datetime tuples still to be downloaded
+    """
+    gaps = []
+    cursor = from_date
+    for start, end in covered:
+        if end <= cursor:
+            continue
+        if start >= to_date:
+            break
+        if start > cursor:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < to_date:
+        gaps.append((cursor, to_date))
+    return gaps
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class HistoricalStore:
+    """
+    Local Parquet store of Kite candles, partitioned by interval, instrument and day.
+
+    Layout: <root>/<interval>/<instrument_token>/<YYYY-MM-DD>.parquet, plus a
+    _coverage.json per instrument listing the ranges already downloaded so that
+    top-ups (and holidays/weekends with no candles) are never fetched twice.
+    Parquet support needs pyarrow or fastparquet installed alongside pandas.
+
+    Args:
+        kite: Logged-in KiteConnect instance
+        root (str): Directory to keep the store in
+        rate (float): Historical API requests per second across all workers
+        max_workers (int): Parallel downloads
+    """
+
+    def __init__(self, kite, root="historical", rate=3.0, max_workers=4):
+        self.kite = kite
+        self.root = root
+        self.limiter = RateLimiter(rate=rate, burst=max(1, int(rate)))
+        self.max_workers = max_workers
+
+    def _dir(self, token, interval):
+        return os.path.join(self.root, interval, str(token))
+
+    def _coverage_file(self, token, interval):
+        return os.path.join(self._dir(token, interval), "_coverage.json")
+
+    def coverage(self, token, interval):
+        """
+        Returns:
+            list: (start, end) datetime tuples already downloaded for the instrument
+        """
+        path = self._coverage_file(token, interval)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r") as f:
+            ranges = json.load(f)
+        return [(datetime.datetime.fromisoformat(s), datetime.datetime.fromisoformat(e)) for s, e in ranges]
+
+    def _save_coverage(self, token, interval, ranges):
+        os.makedirs(self._dir(token, interval), exist_ok=True)
+        path = self._coverage_file(token, interval)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump([[s.isoformat(), e.isoformat()] for s, e in _merge_ranges(ranges)], f)
+        os.replace(tmp, path)
+
+    def _fetch(self, token, start, end, interval, oi):
+        self.limiter.acquire()
+        candles = self.kite.historical_data(token, start, end, interval, oi=oi)
+        logger.info(f"Fetched {len(candles)} {interval} candles for {token}: {start} -> {end}")
+        return candles
+
+    def _write(self, token, interval, candles):
+        if not candles:
+            return
+        directory = self._dir(token, interval)
+        os.makedirs(directory, exist_ok=True)
+        df = pd.DataFrame(candles)
+        df["date"] = pd.to_datetime(df["date"])
+        for day, part in df.groupby(df["date"].dt.date):
+            path = os.path.join(directory, f"{day.isoformat()}.parquet")
+            if os.path.exists(path):
+                part = pd.concat([pd.read_parquet(path), part])
+            part = part.drop_duplicates("date", keep="last").sort_values("date")
+            tmp = path + ".tmp"
+            part.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+
+    def update(self, tokens, interval, from_date, to_date=None, oi=False):
+        """
+        Download whatever is missing for the given instruments and range.
+
+        Ranges already in the store are skipped; the rest are split into
+        API-sized windows and fetched in parallel under the rate limiter.
+        The still-forming candle is stored but not marked as covered, so the
+        next update fetches it again once it has closed.
+
+        Args:
+            tokens (list): Instrument tokens
+            interval (str): Kite interval ('minute', '5minute', 'day', ...)
+            from_date (datetime): Start of the range
+            to_date (datetime): End of the range, defaults to now (IST)
+            oi (bool): Also fetch open interest
+
+        Returns:
+            int: Number of candles downloaded
+        """
+        now = datetime.datetime.now(IST).replace(tzinfo=None, microsecond=0)
+        to_date = min(to_date or now, now)
+        complete = now - CANDLE_LENGTH[interval]
+
+        tasks = []
+        covered = {}
+        for token in tokens:
+            covered[token] = self.coverage(token, interval)
+            for start, end in missing_ranges(covered[token], from_date, to_date):
+                tasks.extend((token, s, e) for s, e in split_range(start, end, interval))
+        if not tasks:
+            logger.info(f"Store already covers {len(tokens)} instruments for {from_date} -> {to_date}")
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [(task, pool.submit(self._fetch, *task, interval, oi)) for task in tasks]
+
+        downloaded = {}
+        failed = set()
+        for (token, start, end), future in futures:
+            try:
+                downloaded.setdefault(token, []).extend(future.result())
+                if start < complete:
+                    covered[token].append((start, min(end, complete)))
+            except Exception as e:
+                logger.error(f"Historical fetch failed for {token} {start} -> {end}: {e}")
+                failed.add(token)
+
+        total = 0
+        for token, candles in downloaded.items():
+            self._write(token, interval, candles)
+            self._save_coverage(token, interval, covered[token])
+            total += len(candles)
+        if failed:
+            logger.error(f"Incomplete download for {sorted(failed)}; rerun update() to retry the gaps")
+        return total
+
+    def load(self, token, interval, from_date=None, to_date=None):
+        """
+        Read candles for one instrument from the store.
+
+        Returns:
+            DataFrame: Candles sorted by date (empty if nothing is stored)
+        """
+        directory = self._dir(token, interval)
+        if not os.path.isdir(directory):
+            return pd.DataFrame()
+        first = from_date.date().isoformat() if from_date else ""
+        last = to_date.date().isoformat() if to_date else "9999"
+        files = sorted(
+            name for name in os.listdir(directory)
+            if name.endswith(".parquet") and first <= name[:10] <= last
+        )
+        if not files:
+            return pd.DataFrame()
+        df = pd.concat([pd.read_parquet(os.path.join(directory, name)) for name in files], ignore_index=True)
+        if from_date is not None:
+            df = df[df["date"] >= pd.Timestamp(from_date, tz=df["date"].dt.tz)]
+        if to_date is not None:
+            df = df[df["date"] <= pd.Timestamp(to_date, tz=df["date"].dt.tz)]
+        return df.reset_index(drop=True)
+
+    def get(self, tokens, interval, from_date, to_date=None, oi=False):
+        """
+        Top up the store and return candles for each instrument.
+
+        Returns:
+            dict: instrument_token -> DataFrame
+        """
+        self.update(tokens, interval, from_date, to_date, oi=oi)
+        return {token: self.load(token, interval, from_date, to_date) for token in tokens}
+
+
+# Usage (with a logged-in kite session):
+# store = HistoricalStore(kite, root="historical")
+# store.update([260105, 256265], "minute", datetime.datetime(2025, 1, 1))   # first run downloads everything
+# store.update([260105, 256265], "minute", datetime.datetime(2025, 1, 1))   # later runs fetch only the new candles
+# candles = store.load(260105, "minute", datetime.datetime(2025, 6, 1), datetime.datetime(2025, 6, 30))
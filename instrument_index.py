@@ -0,0 +1,218 @@
+import csv
+import io
+import logging
+import os
+import threading
+import time
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENTS_URL = "https://api.kite.trade/instruments"
+NUMERIC_COLUMNS = ["instrument_token", "exchange_token", "last_price", "strike", "tick_size", "lot_size"]
+
+
+def download_exchange(exchange, url=INSTRUMENTS_URL, timeout=60):
+    """
+    Download the instrument dump for a single exchange (e.g., 'NFO').
+
+    Returns:
+        tuple: (header, rows) where rows are dicts of the raw CSV strings
+    """
+    with urllib.request.urlopen(f"{url}/{exchange}", timeout=timeout) as response:
+        text = response.read().decode("utf-8")
+    reader = csv.DictReader(io.StringIO(text))
+    return reader.fieldnames, list(reader)
+
+
+def diff_rows(old_rows, new_rows):
+    """
+    Compare two dumps of the same exchange by instrument token.
+
+    Returns:
+        tuple: (upserted rows that are new or changed, set of removed tokens)
+    """
+    new_by_token = {int(row["instrument_token"]): row for row in new_rows}
+    upserted = [row for token, row in new_by_token.items() if old_rows.get(token) != row]
+    removed = set(old_rows) - set(new_by_token)
+    return upserted, removed
+
+
+class InstrumentIndex:
+    """
+    Immutable snapshot of the instrument dump with O(1) lookups.
+
+    Never modified after construction: refreshes build a new index and swap it
+    in, so readers holding a reference always see a consistent view.
+    """
+
+    def __init__(self, by_exchange=None):
+        self.by_exchange = by_exchange or {}  # exchange -> {token: row}
+        self.by_token = {}
+        self.by_symbol = {}
+        for rows in self.by_exchange.values():
+            for token, row in rows.items():
+                self.by_token[token] = row
+                self.by_symbol[(row["exchange"], row["tradingsymbol"])] = token
+        self._frame = None
+        self._frame_lock = threading.Lock()
+
+    def token(self, exchange, trading_symbol):
+        return self.by_symbol.get((exchange, trading_symbol))
+
+    def get(self, token):
+        return self.by_token.get(int(token))
+
+    def __len__(self):
+        return len(self.by_token)
+
+    def apply_diff(self, exchange, upserted, removed):
+        """
+        Returns:
+            InstrumentIndex: New snapshot with the exchange's changes applied
+        """
+        rows = dict(self.by_exchange.get(exchange, {}))
+        for token in removed:
+            rows.pop(token, None)
+        for row in upserted:
+            rows[int(row["instrument_token"])] = row
+        by_exchange = dict(self.by_exchange)
+        by_exchange[exchange] = rows
+        return InstrumentIndex(by_exchange)
+
+    def frame(self):
+        """
+        Returns:
+            DataFrame: The snapshot in the same shape as pd.read_csv() of a Kite instrument dump
+        """
+        with self._frame_lock:
+            if self._frame is None:
+                import pandas as pd
+                df = pd.DataFrame(list(self.by_token.values()))
+                for column in NUMERIC_COLUMNS:
+                    if column in df:
+                        df[column] = pd.to_numeric(df[column], errors="coerce")
+                self._frame = df
+            return self._frame
+
+
+class InstrumentRefresher:
+    """
+    Keeps per-exchange instrument dumps up to date in a background thread.
+
+    Each exchange lives in its own instruments_<EXCHANGE>.csv. At start the
+    local files are loaded straight away; exchanges whose file is older than
+    max_age_hours are re-downloaded in the background, diffed against the
+    current index (added/expired/changed contracts) and swapped in atomically.
+    Several processes can share the same data_dir: a file refreshed by one of
+    them is simply re-read by the others.
+
+    Args:
+        exchanges (list): Exchanges to keep, e.g. ['NFO'] or ['NSE', 'NFO', 'CDS']
+        data_dir (str): Directory for the per-exchange CSV files
+        max_age_hours (float): Age after which an exchange is refreshed
+        check_interval (float): Seconds between background staleness checks
+    """
+
+    def __init__(self, exchanges=("NFO",), data_dir=".", max_age_hours=12, check_interval=300):
+        self.exchanges = list(exchanges)
+        self.data_dir = data_dir
+        self.max_age = max_age_hours * 3600
+        self.check_interval = check_interval
+        self._index = InstrumentIndex()
+        self._loaded_mtime = {}
+        self._swap_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def index(self):
+        return self._index
+
+    def _path(self, exchange):
+        return os.path.join(self.data_dir, f"instruments_{exchange}.csv")
+
+    def _age(self, exchange):
+        path = self._path(exchange)
+        if not os.path.exists(path):
+            return None
+        return time.time() - os.path.getmtime(path)
+
+    def _load_file(self, exchange):
+        with open(self._path(exchange), "r", newline="") as f:
+            return {int(row["instrument_token"]): row for row in csv.DictReader(f)}
+
+    def _write_file(self, exchange, header, rows):
+        path = self._path(exchange)
+        tmp = path + ".tmp"
+        with open(tmp, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=header)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp, path)
+
+    def _swap(self, exchange, new_rows):
+        with self._swap_lock:
+            current = self._index
+            upserted, removed = diff_rows(current.by_exchange.get(exchange, {}), new_rows)
+            if upserted or removed or exchange not in current.by_exchange:
+                self._index = current.apply_diff(exchange, upserted, removed)
+        return upserted, removed
+
+    def _reload(self, exchange):
+        mtime = os.path.getmtime(self._path(exchange))
+        upserted, removed = self._swap(exchange, self._load_file(exchange).values())
+        self._loaded_mtime[exchange] = mtime
+        return upserted, removed
+
+    def refresh(self, exchange, force=False):
+        """
+        Bring one exchange up to date, from disk if another process already refreshed it.
+        """
+        age = self._age(exchange)
+        if force or age is None or age >= self.max_age:
+            header, rows = download_exchange(exchange)
+            self._write_file(exchange, header, rows)
+            self._loaded_mtime[exchange] = os.path.getmtime(self._path(exchange))
+            upserted, removed = self._swap(exchange, rows)
+            source = "download"
+        else:
+            upserted, removed = self._reload(exchange)
+            source = f"cached file (age {age / 3600:.2f} hours)"
+        logger.info(f"{exchange} instruments from {source}: {len(upserted)} added/changed, {len(removed)} expired")
+
+    def start(self, wait=False):
+        """
+        Load what is on disk and start the background refresh thread.
+
+        Args:
+            wait (bool): Block until stale or missing exchanges are downloaded
+        """
+        for exchange in self.exchanges:
+            age = self._age(exchange)
+            if age is not None:
+                self._reload(exchange)
+            if wait and (age is None or age >= self.max_age):
+                self.refresh(exchange, force=True)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="instrument-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            for exchange in self.exchanges:
+                try:
+                    age = self._age(exchange)
+                    if age is None or age >= self.max_age:
+                        self.refresh(exchange, force=True)
+                    elif os.path.getmtime(self._path(exchange)) > self._loaded_mtime.get(exchange, 0):
+                        self.refresh(exchange)
+                except Exception as e:
+                    logger.error(f"Instrument refresh failed for {exchange}: {e}")
+            self._wake.wait(timeout=self.check_interval)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
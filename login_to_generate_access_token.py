@@ -1,12 +1,13 @@
 import logging
 from kiteconnect import KiteConnect
-import pandas as pd
 import os
-import datetime
-import numpy as np
-import time
+from concurrent.futures import ThreadPoolExecutor
+from historical_data import RateLimiter
+from instrument_index import InstrumentRefresher
+from option_chain import spot_key, nearest_expiry_chains, select_atm_legs
+from structured_logging import setup_logging
 
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 
 api_key = " "
 api_secret = " "
@@ -38,77 +39,89 @@ if not set_access_token_from_file():
         f.write(access_token)
     logging.info("Access token saved to access_token.txt")
 
-# Load instruments.csv, refresh if older than 12 hours
-def get_instrument_list(local_file="instruments.csv", url="https://api.kite.trade/instruments", max_age_hours=12):
-    if os.path.exists(local_file):
-        file_age = (time.time() - os.path.getmtime(local_file)) / 3600
-        if file_age < max_age_hours:
-            logging.info(f"Using cached instruments file ({local_file}), age: {file_age:.2f} hours.")
-            return pd.read_csv(local_file)
-        else:
-            logging.info(f"Cached instruments file is older than {max_age_hours} hours. Downloading new file...")
-    else:
-        logging.info("No cached instruments file found. Downloading new file...")
-    df = pd.read_csv(url)
-    df.to_csv(local_file, index=False)
-    return df
+# Load per-exchange instrument dumps, refreshing any older than 12 hours.
+# Only the option exchanges are needed here; spot LTPs come from kite.ltp().
+def get_instrument_list(exchanges=("NFO", "BFO"), max_age_hours=12):
+    refresher = InstrumentRefresher(exchanges, max_age_hours=max_age_hours)
+    # One-shot script: wait for stale dumps so new expiries are always present
+    refresher.start(wait=True)
+    instruments = refresher.index.frame()
+    logging.info(f"Loaded {len(instruments)} instruments for {', '.join(exchanges)}.")
+    return instruments
 
 # Use the function to load instruments
 instruments = get_instrument_list()
 
-# Get BANKNIFTY index LTP
-idx_row = instruments[(instruments['segment'] == 'INDICES') & (instruments['name'] == 'NIFTY BANK')]
-ltp_key = f"{idx_row['exchange'].iloc[0]}:{idx_row['tradingsymbol'].iloc[0]}"
-ltp = kite.ltp(ltp_key)[ltp_key]['last_price']
-strike = int(round(ltp / 100.0) * 100)
-logging.info(f"BANKNIFTY LTP: {ltp}, Rounded Strike: {strike}")
-
-# Find nearest expiry for BANKNIFTY options
-bn_opts = instruments[
-    (instruments["name"] == "BANKNIFTY") &
-    (instruments["segment"] == "NFO-OPT") &
-    (instruments["instrument_type"].isin(["CE", "PE"]))
-]
-today = datetime.date.today()
-expiries = sorted(bn_opts["expiry"].unique())
-nearest_expiry = next(
-    (e for e in expiries if datetime.datetime.strptime(str(e), "%Y-%m-%d").date() >= today), None
-)
-if not nearest_expiry:
-    logging.error("No valid future expiry found for BANKNIFTY options.")
-    exit(1)
-logging.info(f"Nearest expiry: {nearest_expiry}")
-
-# Construct option symbol
-expiry_dt = datetime.datetime.strptime(nearest_expiry, "%Y-%m-%d")
-# Place orders for both CE and PE
-for option_type in ["CE", "PE"]:
-    bn_symbol = f"BANKNIFTY{expiry_dt.strftime('%y%b').upper()}{int(strike)}{option_type}"
-    contract = bn_opts[
-        (bn_opts['tradingsymbol'] == bn_symbol) &
-        (bn_opts['expiry'] == nearest_expiry) &
-        (bn_opts['strike'] == strike) &
-        (bn_opts['instrument_type'] == option_type)
-    ]
-    if not contract.empty:
-        lot_size = int(contract['lot_size'].iloc[0])
-        logging.info(f"Lot size for {bn_symbol}: {lot_size}")
-    else:
-        logging.error(f"Could not find lot size for {bn_symbol}.")
-        continue  # Skip to next option_type
-
-    # Place order
+# Underlyings to trade; indices and stocks can be mixed
+UNDERLYINGS = ["BANKNIFTY"]
+OTM_STEPS = 0  # 0 = ATM straddle, N = strangle N strikes away from ATM
+
+# Kite accepts 10 orders/s. With a burst of 2 refilling at 8/s no one-second
+# window ever sees more than 10, however many legs there are.
+MAX_ORDER_WORKERS = 4
+order_limiter = RateLimiter(rate=8, burst=2)
+
+
+def place_leg(leg):
+    order_limiter.acquire()
     try:
         order_id = kite.place_order(
-            tradingsymbol=bn_symbol,
-            exchange=kite.EXCHANGE_NFO,
+            tradingsymbol=leg["tradingsymbol"],
+            exchange=leg["exchange"],
             transaction_type=kite.TRANSACTION_TYPE_BUY,
-            quantity=lot_size,
+            quantity=int(leg["lot_size"]),
             variety=kite.VARIETY_REGULAR,
             order_type=kite.ORDER_TYPE_MARKET,
             product=kite.PRODUCT_MIS,
             validity=kite.VALIDITY_DAY
         )
-        logging.info(f"Order placed for {bn_symbol}. ID is: {order_id}")
+        logging.info(f"Order placed for {leg['tradingsymbol']} ({leg['instrument_token']}). ID is: {order_id}")
+        return order_id
     except Exception as e:
-        logging.info(f"Order placement failed for {bn_symbol}: {str(e)}")
+        logging.info(f"Order placement failed for {leg['tradingsymbol']}: {str(e)}")
+        return None
+
+
+def place_atm_orders(underlyings, otm_steps=0):
+    """
+    Buy the ATM straddle (or strangle) for every underlying in one go.
+
+    Spot LTPs are fetched with a single kite.ltp() call, strikes are rounded
+    with the step of each underlying's own chain, and legs are sent from a
+    small thread pool paced to stay under Kite's order rate limit.
+
+    Args:
+        underlyings (list): Option names, e.g. ['BANKNIFTY', 'NIFTY', 'RELIANCE']
+        otm_steps (int): 0 for a straddle, N for a strangle N strikes away from ATM
+
+    Returns:
+        dict: tradingsymbol -> order_id (None where placement failed)
+    """
+    keys = {name: spot_key(name) for name in underlyings}
+    ltps = kite.ltp(*keys.values())
+    spot_ltps = {name: ltps[key]["last_price"] for name, key in keys.items() if key in ltps}
+    for name in underlyings:
+        if name not in spot_ltps:
+            logging.error(f"No spot LTP for {name} ({keys[name]}).")
+
+    chains = nearest_expiry_chains(instruments, underlyings)
+    legs = select_atm_legs(chains, spot_ltps, otm_steps=otm_steps)
+    for name in set(underlyings) - set(legs["name"]):
+        logging.error(f"No valid future expiry found for {name} options.")
+    for leg in legs.itertuples():
+        logging.info(f"{leg.name} LTP: {leg.spot}, step: {leg.step:g}, ATM: {leg.atm:g}, "
+                     f"{leg.instrument_type} leg: {leg.tradingsymbol} expiry {leg.expiry}, lot size {leg.lot_size}")
+
+    records = legs.to_dict("records")
+    if not records:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(len(records), MAX_ORDER_WORKERS)) as pool:
+        order_ids = list(pool.map(place_leg, records))
+    return {leg["tradingsymbol"]: order_id for leg, order_id in zip(records, order_ids)}
+
+
+place_atm_orders(UNDERLYINGS, otm_steps=OTM_STEPS)
+
+# Multiple underlyings in one call (single batched LTP fetch, legs sent concurrently at up to 8/s):
+# place_atm_orders(["BANKNIFTY", "NIFTY", "FINNIFTY", "RELIANCE"])
+# place_atm_orders(["NIFTY", "SENSEX"], otm_steps=2)   # 2-strike-wide strangles
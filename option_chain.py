@@ -0,0 +1,120 @@
+import datetime
+import numpy as np
+import pandas as pd
+
+# Spot instruments for underlyings whose option "name" differs from the index tradingsymbol.
+# Anything not listed here is treated as an NSE stock with the same name.
+SPOT_SYMBOLS = {
+    "NIFTY": "NSE:NIFTY 50",
+    "BANKNIFTY": "NSE:NIFTY BANK",
+    "FINNIFTY": "NSE:NIFTY FIN SERVICE",
+    "MIDCPNIFTY": "NSE:NIFTY MID SELECT",
+    "NIFTYNXT50": "NSE:NIFTY NEXT 50",
+    "SENSEX": "BSE:SENSEX",
+    "BANKEX": "BSE:BANKEX",
+}
+
+
+def spot_key(underlying):
+    """
+    Get the "EXCHANGE:SYMBOL" key used to fetch the spot LTP of an underlying.
+
+    Args:
+        underlying (str): Option name as in the instrument dump (e.g., 'BANKNIFTY', 'RELIANCE')
+
+    Returns:
+        str: Key suitable for kite.ltp() / kite.quote()
+    """
+    return SPOT_SYMBOLS.get(underlying, f"NSE:{underlying}")
+
+
+def strike_step(strikes):
+    """
+    Derive the strike interval of a chain from its listed strikes.
+
+    The most common gap between consecutive strikes is used so that a few
+    irregular far-OTM strikes do not skew the result.
+
+    Args:
+        strikes: Iterable of strike prices for one underlying and expiry
+
+    Returns:
+        float or None: Strike step, or None if fewer than two distinct strikes
+    """
+    unique = np.unique(np.asarray(strikes, dtype=float))
+    if len(unique) < 2:
+        return None
+    gaps = np.round(np.diff(unique), 4)
+    values, counts = np.unique(gaps[gaps > 0], return_counts=True)
+    return float(values[np.argmax(counts)])
+
+
+def atm_strike(ltp, step):
+    """
+    Round spot price(s) to the nearest strike. Works on scalars and numpy arrays.
+    """
+    return np.round(np.asarray(ltp, dtype=float) / step) * step
+
+
+def nearest_expiry_chains(instruments, underlyings, today=None):
+    """
+    Get the nearest-expiry option chain for every underlying in one pass.
+
+    Args:
+        instruments (DataFrame): Instrument dump, e.g. InstrumentIndex.frame()
+        underlyings (list): Option names (e.g., ['BANKNIFTY', 'NIFTY', 'RELIANCE'])
+        today (date): Reference date, defaults to today
+
+    Returns:
+        DataFrame: CE/PE rows of the nearest non-expired expiry for each underlying
+    """
+    today = (today or datetime.date.today()).isoformat()
+    opts = instruments[
+        (instruments["name"].isin(underlyings)) &
+        (instruments["segment"].isin(["NFO-OPT", "BFO-OPT"])) &
+        (instruments["instrument_type"].isin(["CE", "PE"]))
+    ]
+    opts = opts[opts["expiry"].astype(str) >= today]
+    nearest = opts.groupby("name")["expiry"].transform("min")
+    return opts[opts["expiry"] == nearest]
+
+
+def select_atm_legs(chains, spot_ltps, otm_steps=0):
+    """
+    Pick the CE and PE contracts around ATM for every underlying.
+
+    With otm_steps=0 this is a straddle; otherwise the CE is taken otm_steps
+    strikes above ATM and the PE otm_steps strikes below (a strangle).
+    Contracts are resolved from the chain itself, so no tradingsymbol is built
+    by hand and weekly expiries resolve the same way as monthly ones.
+
+    Args:
+        chains (DataFrame): Output of nearest_expiry_chains()
+        spot_ltps (dict): Underlying name -> spot LTP
+        otm_steps (int): Number of strikes away from ATM for each leg
+
+    Returns:
+        DataFrame: One row per leg with name, spot, step, atm and the contract columns
+    """
+    steps = chains.groupby("name")["strike"].apply(strike_step).dropna()
+    names = [n for n in steps.index if n in spot_ltps]
+    if not names:
+        return chains.iloc[0:0]
+
+    spot = np.array([spot_ltps[n] for n in names], dtype=float)
+    step = steps.loc[names].to_numpy()
+    atm = atm_strike(spot, step)
+    targets = pd.DataFrame({
+        "name": np.repeat(names, 2),
+        "instrument_type": ["CE", "PE"] * len(names),
+        "spot": np.repeat(spot, 2),
+        "step": np.repeat(step, 2),
+        "atm": np.repeat(atm, 2),
+        "target_strike": np.column_stack([atm + otm_steps * step, atm - otm_steps * step]).ravel(),
+    })
+
+    # Nearest listed strike to each target, in case the exact strike is not listed
+    legs = targets.merge(chains, on=["name", "instrument_type"])
+    legs["distance"] = (legs["strike"] - legs["target_strike"]).abs()
+    legs = legs.sort_values("distance").drop_duplicates(["name", "instrument_type"])
+    return legs.sort_values(["name", "instrument_type"]).drop(columns="distance").reset_index(drop=True)
@@ -0,0 +1,538 @@
+import csv
+import hmac
+import json
+import logging
+import os
+import queue
+import re
+import socketserver
+import threading
+import time
+from dataclasses import dataclass, field
+
+try:
+    import inotify_simple
+except ImportError:  # Linux-only optional dependency; fall back to polling the directory
+    inotify_simple = None
+
+logger = logging.getLogger(__name__)
+
+# First line of an HTTP request, e.g. b"POST / HTTP/1.1"
+HTTP_REQUEST_LINE = re.compile(rb"^[A-Z]+ \S+ HTTP/\d")
+
+# Rows with these statuses (column D) have already been handled
+DONE_STATUSES = ("ORDER_PLACED", "RISK_REJECTED")
+
+
+@dataclass
+class OrderRow:
+    """
+    One order request, normalized from whichever source it came from.
+    """
+    symbol: str
+    direction: str
+    quantity: int
+    source: str = ""  # spreadsheet id
+    tab: str = ""
+    row: int = 0  # 1-based row in the tab
+    alias: str = ""  # short name for the source in log ids, defaults to the source itself
+
+    @property
+    def correlation_id(self):
+        # Tab names repeat across spreadsheets, so the id starts with the source
+        return f"{self.alias or self.source}:{self.tab}!{self.row}"
+
+
+@dataclass
+class OrderBatch:
+    """
+    Everything read in one intake cycle.
+    """
+    orders: list = field(default_factory=list)
+    config: dict = field(default_factory=dict)  # spreadsheet id -> list of config cell values
+    total: int = 0
+    skipped: int = 0
+    invalid: int = 0
+
+
+def parse_order_row(values, source="", tab="", row=0, alias=""):
+    """
+    Normalize one sheet row (A: symbol, B: direction, C: quantity, D: status).
+
+    Returns:
+        tuple: (OrderRow or None, outcome) where outcome is 'pending', 'skipped' or 'invalid'
+    """
+    symbol = values[0].strip() if len(values) > 0 else ""
+    direction = (values[1] or "").strip().upper() if len(values) > 1 else ""
+    quantity_str = (values[2] or "").strip() if len(values) > 2 else ""
+    status = (values[3] or "").strip().upper() if len(values) > 3 else ""
+
+    if not symbol or not direction or not quantity_str:
+        return None, "invalid"
+    if status in DONE_STATUSES:
+        return None, "skipped"
+    try:
+        quantity = int(float(quantity_str))
+    except Exception:
+        logger.error(f"Invalid quantity at {tab}!{row}: '{quantity_str}'")
+        return None, "invalid"
+    return OrderRow(symbol, direction, quantity, source, tab, row, alias), "pending"
+
+
+def parse_order_message(message, source="", tab="", row=0, alias=""):
+    """
+    Normalize an order given as a JSON object/line or a "SYMBOL,BUY,10" line.
+
+    Returns:
+        tuple: (OrderRow or None, outcome) as parse_order_row()
+    """
+    if isinstance(message, (bytes, bytearray)):
+        message = message.decode("utf-8")
+    if isinstance(message, str):
+        message = message.strip()
+        if message.startswith("{"):
+            try:
+                message = json.loads(message)
+            except ValueError:
+                logger.error(f"Invalid order message at {tab}!{row}: {message!r}")
+                return None, "invalid"
+        else:
+            message = next(csv.reader([message]), [])
+    if isinstance(message, dict):
+        message = [message.get("symbol", ""), message.get("direction", ""), str(message.get("quantity", ""))]
+    return parse_order_row([str(value) for value in message], source, tab, row, alias)
+
+
+class OrderIntake:
+    """
+    Where orders come from. Backends return pending orders from poll() and
+    record the outcome of each order with mark()/mark_many().
+
+    Push-based backends block in poll() until an order arrives or the timeout
+    passes; pull-based ones read straight away and leave the pacing to the caller.
+    """
+
+    name = "intake"
+    poll_interval = 0  # seconds the runner waits between polls
+    row_delay = 0.1  # seconds between orders of one batch (Kite allows 10 orders/s)
+    rereads_pending = False  # True if unmarked orders come back on the next poll
+
+    def poll(self, timeout=None):
+        raise NotImplementedError
+
+    def mark(self, order, values):
+        raise NotImplementedError
+
+    def mark_many(self, marks):
+        for order, values in marks:
+            self.mark(order, values)
+
+    def close(self):
+        pass
+
+
+class SheetIntake(OrderIntake):
+    """
+    Reads order tabs and config cells from any number of spreadsheets.
+
+    Each cycle costs one values_batch_get per spreadsheet, however many tabs
+    and config cells it has. Spreadsheet handles are opened once and reused.
+
+    Args:
+        client: Authorized gspread client
+        sources (list): Dicts with 'spreadsheet_id', 'tabs' (order tab names) and
+            optionally 'config_range' (e.g. "Info!B1:B3") and 'alias' (short name
+            used in correlation ids, defaults to the first 8 characters of the id)
+    """
+
+    name = "sheet"
+    poll_interval = 10
+    row_delay = 1
+    rereads_pending = True
+
+    def __init__(self, client, sources):
+        self.client = client
+        self.sources = sources
+        self._spreadsheets = {}
+
+    def _spreadsheet(self, spreadsheet_id):
+        if spreadsheet_id not in self._spreadsheets:
+            self._spreadsheets[spreadsheet_id] = self.client.open_by_key(spreadsheet_id)
+        return self._spreadsheets[spreadsheet_id]
+
+    def read_config(self, spreadsheet_id, config_range):
+        """
+        Read a block of config cells with a single call.
+
+        Returns:
+            list: Cell values in order (empty cells as None)
+        """
+        response = self._spreadsheet(spreadsheet_id).values_get(config_range)
+        return [row[0] if row else None for row in response.get("values", [])]
+
+    def poll(self, timeout=None):
+        """
+        Read every configured tab and config range.
+
+        Returns:
+            OrderBatch: Pending orders from all sources plus per-spreadsheet config
+        """
+        batch = OrderBatch()
+        for source in self.sources:
+            spreadsheet_id = source["spreadsheet_id"]
+            alias = source.get("alias") or spreadsheet_id[:8]
+            tabs = list(source.get("tabs", []))
+            ranges = [f"'{tab}'!A:F" for tab in tabs]
+            if source.get("config_range"):
+                ranges.append(source["config_range"])
+            try:
+                response = self._spreadsheet(spreadsheet_id).values_batch_get(ranges)
+            except Exception as e:
+                logger.error(f"Reading spreadsheet {spreadsheet_id} failed: {e}")
+                continue
+            value_ranges = response.get("valueRanges", [])
+
+            for tab, value_range in zip(tabs, value_ranges):
+                rows = value_range.get("values", [])
+                # rows[0] is header; start from index 1
+                for idx in range(1, len(rows)):
+                    batch.total += 1
+                    order, outcome = parse_order_row(rows[idx], spreadsheet_id, tab, idx + 1, alias)
+                    if outcome == "pending":
+                        batch.orders.append(order)
+                    elif outcome == "skipped":
+                        batch.skipped += 1
+                    else:
+                        batch.invalid += 1
+
+            if source.get("config_range") and len(value_ranges) > len(tabs):
+                cells = value_ranges[len(tabs)].get("values", [])
+                batch.config[spreadsheet_id] = [row[0] if row else None for row in cells]
+        return batch
+
+    def mark(self, order, values):
+        """
+        Write status columns D:F for one order straight away.
+        """
+        self._spreadsheet(order.source).values_update(
+            f"'{order.tab}'!D{order.row}:F{order.row}",
+            params={"valueInputOption": "RAW"},
+            body={"values": [values]},
+        )
+
+    def mark_many(self, marks):
+        """
+        Write status columns for several orders, one call per spreadsheet.
+
+        Args:
+            marks (list): (OrderRow, [status, timestamp, detail]) tuples
+        """
+        by_spreadsheet = {}
+        for order, values in marks:
+            by_spreadsheet.setdefault(order.source, []).append(
+                {"range": f"'{order.tab}'!D{order.row}:F{order.row}", "values": [values]})
+        for spreadsheet_id, data in by_spreadsheet.items():
+            self._spreadsheet(spreadsheet_id).values_batch_update({"valueInputOption": "RAW", "data": data})
+
+
+class SpoolIntake(OrderIntake):
+    """
+    Watches a local spool directory for order files.
+
+    Drop *.csv (symbol,direction,quantity per line, header optional) or
+    *.jsonl (one JSON order per line) files into the directory; file names
+    must be unique and every line, the last included, must end with a
+    newline. A file is only picked up once it looks finished: it ends with a
+    newline and, with inotify, has been closed after writing or renamed in,
+    or, without inotify, is unchanged since the previous scan. Names starting
+    with a dot and other extensions (e.g. ".orders.tmp") are ignored, so the
+    safest way to submit is to write under such a name and rename the file
+    in (without inotify, a writer that stops for longer than poll_every
+    between whole lines can otherwise have its file picked up early). A picked-up file is claimed into inflight/, the outcome of each of its
+    orders is appended to done/<file>.status.jsonl, and the file moves to
+    done/ once every order has an outcome. Files still in inflight/ at start
+    (e.g. after a crash) are read again, skipping orders that already have
+    an outcome. Uses inotify when inotify_simple is installed, otherwise
+    polls the directory every poll_every seconds; wake_mode says which
+    ("inotify" or "scan").
+
+    Args:
+        directory (str): Spool directory to watch
+        poll_every (float): Directory scan interval without inotify
+    """
+
+    name = "spool"
+    EXTENSIONS = (".csv", ".jsonl")
+
+    def __init__(self, directory, poll_every=0.01):
+        self.directory = directory
+        self.alias = os.path.basename(os.path.normpath(directory))
+        self.inflight_dir = os.path.join(directory, "inflight")
+        self.done_dir = os.path.join(directory, "done")
+        self.poll_every = poll_every
+        os.makedirs(self.inflight_dir, exist_ok=True)
+        os.makedirs(self.done_dir, exist_ok=True)
+        self._remaining = {}  # file name -> line numbers of orders without an outcome yet
+        self._lock = threading.Lock()
+        self._recover = True
+        self._seen = {}  # scan mode: file name -> (size, mtime) at the previous scan
+        self._closed = set()  # inotify mode: files closed after writing or renamed in
+        self._inotify = None
+        self.wake_mode = "scan"
+        if inotify_simple is not None:
+            self._inotify = inotify_simple.INotify()
+            flags = inotify_simple.flags
+            self._inotify.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO)
+            self.wake_mode = "inotify"
+            # No events for files already there; the trailing newline check still applies
+            self._closed.update(self._candidates(directory))
+
+    def _candidates(self, directory):
+        with os.scandir(directory) as entries:
+            return {e.name: e.stat() for e in entries
+                    if e.is_file() and not e.name.startswith(".") and e.name.endswith(self.EXTENSIONS)}
+
+    def _read_events(self, timeout_ms):
+        self._closed.update(event.name for event in self._inotify.read(timeout=timeout_ms))
+
+    def _ends_with_newline(self, name):
+        try:
+            with open(os.path.join(self.directory, name), "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) == b"\n"
+        except OSError:  # empty, or claimed in the meantime
+            return False
+
+    def _ready_files(self):
+        files = self._candidates(self.directory)
+        if self._inotify is not None:
+            self._read_events(0)
+            self._closed &= files.keys()
+            settled = set(self._closed)
+        else:
+            # A file still being written changes size or mtime between scans
+            current = {name: (stat.st_size, stat.st_mtime_ns) for name, stat in files.items()}
+            settled = {name for name, seen in current.items() if self._seen.get(name) == seen}
+            self._seen = current
+        return sorted(name for name in settled if self._ends_with_newline(name))
+
+    def _wait(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._ready_files():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return
+            if self._inotify is not None:
+                self._read_events(None if remaining is None else max(1, int(remaining * 1000)))
+            else:
+                time.sleep(self.poll_every)
+
+    def _status_path(self, name):
+        return os.path.join(self.done_dir, f"{name}.status.jsonl")
+
+    def _marked_lines(self, name):
+        if not os.path.exists(self._status_path(name)):
+            return set()
+        with open(self._status_path(name), "r") as f:
+            return {json.loads(line)["line"] for line in f if line.strip()}
+
+    def _read(self, name, batch, marked):
+        pending = set()
+        with open(os.path.join(self.inflight_dir, name), "r", newline="") as f:
+            lines = f.read().splitlines()
+        for number, line in enumerate(lines, start=1):
+            if not line.strip() or number in marked:
+                continue
+            if number == 1 and name.endswith(".csv") and line.lower().startswith("symbol"):
+                continue
+            batch.total += 1
+            order, outcome = parse_order_message(line, self.directory, name, number, self.alias)
+            if outcome == "pending":
+                batch.orders.append(order)
+                pending.add(number)
+            else:
+                batch.invalid += 1
+        return pending
+
+    def _finish(self, name):
+        os.replace(os.path.join(self.inflight_dir, name), os.path.join(self.done_dir, name))
+
+    def poll(self, timeout=None):
+        batch = OrderBatch()
+        claimed = []
+        if self._recover:
+            self._recover = False
+            claimed = [(name, self._marked_lines(name)) for name in sorted(self._candidates(self.inflight_dir))]
+        names = self._ready_files()
+        if not names and not claimed:
+            self._wait(timeout)
+            names = self._ready_files()
+        for name in names:
+            self._closed.discard(name)
+            try:
+                os.replace(os.path.join(self.directory, name), os.path.join(self.inflight_dir, name))
+            except FileNotFoundError:
+                continue  # picked up by another poller
+            claimed.append((name, set()))
+        for name, marked in claimed:
+            pending = self._read(name, batch, marked)
+            with self._lock:
+                if pending:
+                    self._remaining[name] = pending
+                else:
+                    self._finish(name)
+        return batch
+
+    def mark(self, order, values):
+        status = {"line": order.row, "symbol": order.symbol, "status": values[0], "timestamp": values[1], "detail": values[2]}
+        with open(self._status_path(order.tab), "a") as f:
+            f.write(json.dumps(status, default=str) + "\n")
+        with self._lock:
+            remaining = self._remaining.get(order.tab)
+            if remaining is None:
+                return
+            remaining.discard(order.row)
+            if not remaining:
+                del self._remaining[order.tab]
+                self._finish(order.tab)
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+
+
+class SocketIntake(OrderIntake):
+    """
+    Accepts orders over a local Unix socket (default) or TCP.
+
+    Every connection must open with "AUTH <token>" carrying the shared secret
+    the intake was created with. A connection whose first line is anything
+    else is closed without reading further; an HTTP request line (what a
+    browser fetch() to a local port sends) is dropped the same way. After
+    that, clients send one order per line, as JSON ({"symbol": "SBIN",
+    "direction": "BUY", "quantity": 10}) or as "SBIN,BUY,10", and each order
+    is answered on the same connection with a JSON line carrying its
+    sequence number and outcome. The Unix socket is made owner-only (0600);
+    TCP still needs the token but is open to every local process.
+
+    Args:
+        token (str): Shared secret clients send in their AUTH line
+        path (str): Unix socket path, DEFAULT_SOCKET_PATH unless address is given
+        address (tuple): (host, port) to listen on TCP instead, e.g. ("127.0.0.1", 9010)
+    """
+
+    name = "socket"
+    DEFAULT_SOCKET_PATH = "order_intake.sock"
+    MAX_LINE = 4096
+
+    def __init__(self, token, path=None, address=None):
+        if not token:
+            raise ValueError("SocketIntake needs a shared-secret token")
+        self._token = token.encode("utf-8")
+        self._queue = queue.Queue()
+        self._clients = {}  # connection id -> (wfile, lock)
+        self._seq = 0
+        self._lock = threading.Lock()
+        intake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                first = self.rfile.readline(intake.MAX_LINE)
+                if HTTP_REQUEST_LINE.match(first):
+                    logger.warning("Socket intake dropped a connection that sent an HTTP request")
+                    return
+                if not intake._authorized(first):
+                    logger.warning("Socket intake dropped a connection with a missing or wrong token")
+                    self.wfile.write(b'{"status": "Unauthorized"}\n')
+                    return
+                with intake._lock:
+                    intake._seq += 1
+                    conn_id = f"conn-{intake._seq}"
+                intake._clients[conn_id] = (self.wfile, threading.Lock())
+                try:
+                    for number, line in enumerate(iter(lambda: self.rfile.readline(intake.MAX_LINE), b""), start=1):
+                        if line.strip():
+                            intake._queue.put((conn_id, number, line))
+                finally:
+                    intake._clients.pop(conn_id, None)
+
+        if address is None:
+            path = path or self.DEFAULT_SOCKET_PATH
+            if os.path.exists(path):
+                os.unlink(path)
+            self.server = socketserver.ThreadingUnixStreamServer(path, Handler)
+            os.chmod(path, 0o600)
+            self.address = path
+        else:
+            self.server = socketserver.ThreadingTCPServer(address, Handler)
+            self.address = self.server.server_address
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name="socket-intake", daemon=True)
+        self._thread.start()
+        logger.info(f"Socket intake listening on {self.address}")
+
+    def _authorized(self, line):
+        keyword, _, token = line.strip().partition(b" ")
+        return keyword == b"AUTH" and hmac.compare_digest(token.strip(), self._token)
+
+    def poll(self, timeout=None):
+        batch = OrderBatch()
+        try:
+            items = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return batch
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for conn_id, number, line in items:
+            batch.total += 1
+            order, outcome = parse_order_message(line, "socket", conn_id, number)
+            if outcome == "pending":
+                batch.orders.append(order)
+            else:
+                batch.invalid += 1
+                self._reply(conn_id, {"seq": number, "status": "Invalid"})
+        return batch
+
+    def _reply(self, conn_id, message):
+        client = self._clients.get(conn_id)
+        if client is None:
+            return
+        wfile, lock = client
+        try:
+            with lock:
+                wfile.write((json.dumps(message, default=str) + "\n").encode("utf-8"))
+                wfile.flush()
+        except OSError:
+            self._clients.pop(conn_id, None)
+
+    def mark(self, order, values):
+        self._reply(order.tab, {"seq": order.row, "symbol": order.symbol, "status": values[0],
+                                "timestamp": values[1], "detail": values[2]})
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+def run_intake(intake, handler, stop=None):
+    """
+    Feed batches from one backend to handler(intake, batch) until stop is set.
+
+    Push backends block in poll() and hand over orders as soon as they arrive;
+    pull backends are polled every intake.poll_interval seconds.
+    """
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            batch = intake.poll(timeout=0.5)
+            if batch.orders or intake.poll_interval:
+                handler(intake, batch)
+        except Exception as e:
+            logger.error(f"{intake.name} intake error: {e}")
+        if intake.poll_interval:
+            stop.wait(intake.poll_interval)
@@ -0,0 +1,39 @@
+CURRENCIES = ['USDINR', 'EURINR', 'GBPINR', 'JPYINR', 'INR']
+
+# Passive limit pricing: BUY joins the best bid, SELL joins the best ask
+PASSIVE_SIDE = {"BUY": "buy", "SELL": "sell"}
+
+
+def detect_exchange(symbol):
+    """
+    Guess the exchange from a trading symbol.
+
+    Symbols with two or more digits are derivatives: CDS if they contain a
+    currency pair, NFO otherwise. Everything else is an NSE equity.
+    """
+    if sum(1 for char in symbol if char.isdigit()) >= 2:
+        if any(currency in symbol.upper() for currency in CURRENCIES):
+            return "CDS"
+        return "NFO"
+    return "NSE"
+
+
+def default_product(exchange):
+    """
+    CNC for equity shares, NRML for derivatives.
+    """
+    return "CNC" if exchange == "NSE" else "NRML"
+
+
+def limit_price(depth, direction):
+    """
+    Get the passive limit price for an order from market depth.
+
+    Args:
+        depth (dict): 'depth' section of a kite.quote() entry
+        direction (str): 'BUY' or 'SELL'
+
+    Returns:
+        float: Best bid for BUY, best ask for SELL
+    """
+    return depth[PASSIVE_SIDE[direction]][0]['price']
@@ -1,6 +1,6 @@
 from kiteconnect import KiteConnect
 import os
-import csv
+from instrument_index import InstrumentRefresher
 
 # Your credentials
 api_key = " "
@@ -9,6 +9,10 @@ access_token_file = "access_token.txt"
 
 kite = KiteConnect(api_key=api_key)
 
+# Instrument dumps used for token lookups, loaded on first use
+INSTRUMENT_EXCHANGES = ["NSE", "BSE", "NFO", "CDS"]
+instrument_refresher = None
+
 def get_instrument_token(exchange, trading_symbol):
     """
     Get the instrument token for a given exchange and trading symbol.
@@ -20,27 +24,19 @@ def get_instrument_token(exchange, trading_symbol):
     Returns:
         int or None: Instrument token if found, None otherwise
     """
+    global instrument_refresher
     try:
-        with open('instruments.csv', 'r') as file:
-            csv_reader = csv.reader(file)
-            next(csv_reader)  # Skip header row
-            
-            for row in csv_reader:
-                if len(row) >= 12:  # Ensure row has enough columns
-                    # Check if exchange and trading symbol match
-                    if row[11] == exchange and row[2] == trading_symbol:
-                        instrument_token = int(row[0])
-                        print(f"Found instrument token: {instrument_token} for {trading_symbol} on {exchange}")
-                        return instrument_token
-            
+        if instrument_refresher is None:
+            # Loads instruments_<EXCHANGE>.csv, downloading any missing or stale dump first
+            instrument_refresher = InstrumentRefresher(INSTRUMENT_EXCHANGES).start(wait=True)
+        instrument_token = instrument_refresher.index.token(exchange, trading_symbol)
+        if instrument_token is None:
             print(f"No instrument found for {trading_symbol} on {exchange}")
             return None
-            
-    except FileNotFoundError:
-        print("instruments.csv file not found")
-        return None
+        print(f"Found instrument token: {instrument_token} for {trading_symbol} on {exchange}")
+        return instrument_token
     except Exception as e:
-        print(f"Error reading instruments.csv: {e}")
+        print(f"Error loading instruments: {e}")
         return None
 
 def set_access_token_from_file():
@@ -0,0 +1,298 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Order ids starting with this are reservations made before an order is sent.
+# Like any pending order the broker's order book does not list (yet), they are
+# carried over by refresh()
+RESERVATION_PREFIX = "reserved:"
+
+OPEN_STATUSES = {"OPEN", "TRIGGER PENDING", "AMO REQ RECEIVED", "MODIFY PENDING", "OPEN PENDING", "VALIDATION PENDING", "PUT ORDER REQ RECEIVED"}
+
+
+def _fills(orders):
+    return {o["order_id"]: o.get("filled_quantity") or 0 for o in orders}
+
+
+class PositionCache:
+    """
+    In-memory book of net positions, kept current from our own fills.
+
+    Positions (and optionally holdings) are loaded from the broker once and
+    then every fill from the order-update stream is applied locally; the
+    broker is only asked again every refresh_interval seconds. Quantities,
+    average prices and marks are held in numpy arrays so MTM and exposure are
+    single vectorized expressions, cheap enough to run before every order.
+
+    Args:
+        kite: Logged-in KiteConnect instance
+        refresh_interval (float): Seconds between full reloads from the broker
+        include_holdings (bool): Count delivery holdings towards symbol exposure
+    """
+
+    # Attempts at a positions snapshot no fill lands in the middle of
+    SNAPSHOT_ATTEMPTS = 3
+
+    def __init__(self, kite, refresh_interval=60, include_holdings=False):
+        self.kite = kite
+        self.refresh_interval = refresh_interval
+        self.include_holdings = include_holdings
+        self._lock = threading.RLock()
+        self._loaded_at = 0.0
+        self._reset()
+
+    def _reset(self):
+        self.keys = []  # (exchange, tradingsymbol) per row
+        self.rows = {}  # (exchange, tradingsymbol) -> row index
+        self.token = np.zeros(0, dtype=np.int64)
+        self.quantity = np.zeros(0)
+        self.average_price = np.zeros(0)
+        self.realised = np.zeros(0)
+        self.multiplier = np.ones(0)
+        self.last_price = np.zeros(0)
+        self.pending = np.zeros(0)  # signed quantity of open orders
+        self._filled = {}  # order_id -> (filled_quantity, average_price) already applied, for every order seen
+        self._open = {}  # order_id -> (row, signed unfilled quantity)
+
+    def _row(self, exchange, tradingsymbol, token=0):
+        key = (exchange, tradingsymbol)
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            self.keys.append(key)
+            self.rows[key] = row
+            self.token = np.append(self.token, int(token or 0))
+            self.quantity = np.append(self.quantity, 0.0)
+            self.average_price = np.append(self.average_price, 0.0)
+            self.realised = np.append(self.realised, 0.0)
+            self.multiplier = np.append(self.multiplier, 1.0)
+            self.last_price = np.append(self.last_price, 0.0)
+            self.pending = np.append(self.pending, 0.0)
+        elif token and not self.token[row]:
+            self.token[row] = int(token)
+        return row
+
+    def refresh(self):
+        """
+        Reload positions, holdings and the day's order book from the broker.
+
+        The order book is read before and after the positions; if any filled
+        quantity moved in between, a fill may be in one snapshot and not the
+        other, so the whole read is repeated.
+        """
+        orders = self.kite.orders()
+        for attempt in range(self.SNAPSHOT_ATTEMPTS):
+            positions = self.kite.positions()["net"]
+            holdings = self.kite.holdings() if self.include_holdings else []
+            before, orders = orders, self.kite.orders()
+            if _fills(before) == _fills(orders):
+                break
+            logger.info(f"Order book moved while reading positions, reading again ({attempt + 1})")
+        else:
+            logger.warning("Order book kept moving; positions may be off until the next refresh")
+        with self._lock:
+            listed = {o["order_id"] for o in orders}
+            local = [(self.keys[row], self.token[row], self.last_price[row], order_id, unfilled)
+                     for order_id, (row, unfilled) in self._open.items() if order_id not in listed]
+            self._reset()
+            for p in [dict(h, quantity=h["quantity"] + (h.get("t1_quantity") or 0)) for h in holdings] + positions:
+                row = self._row(p["exchange"], p["tradingsymbol"], p.get("instrument_token"))
+                quantity = p["quantity"]
+                total = self.quantity[row] + quantity
+                if total:
+                    self.average_price[row] = (self.quantity[row] * self.average_price[row] +
+                                               quantity * p["average_price"]) / total
+                self.quantity[row] = total
+                self.realised[row] += p.get("realised", 0) or 0
+                self.multiplier[row] = p.get("multiplier", 1) or 1
+                self.last_price[row] = p.get("last_price", 0) or 0
+            # Fills already in the snapshot must not be applied again from the stream
+            for o in orders:
+                self._filled[o["order_id"]] = (o.get("filled_quantity") or 0, o.get("average_price") or 0)
+                if o.get("status") in OPEN_STATUSES:
+                    self._track_open(o)
+            # Reservations and orders placed while the snapshot was being read
+            for key, token, mark, order_id, unfilled in local:
+                row = self._row(*key, token)
+                self._open[order_id] = (row, unfilled)
+                self.pending[row] += unfilled
+                if not self.last_price[row]:
+                    self.last_price[row] = mark
+            self._loaded_at = time.monotonic()
+        logger.info(f"Position cache loaded {len(self.keys)} instruments, {len(self._open)} open orders")
+
+    def maybe_refresh(self):
+        if time.monotonic() - self._loaded_at >= self.refresh_interval:
+            self.refresh()
+
+    def _track_open(self, order):
+        row = self._row(order["exchange"], order["tradingsymbol"], order.get("instrument_token"))
+        sign = 1 if order["transaction_type"] == "BUY" else -1
+        unfilled = sign * (order["quantity"] - (order.get("filled_quantity") or 0))
+        previous = self._open.pop(order["order_id"], None)
+        if previous is not None:
+            self.pending[previous[0]] -= previous[1]
+        if unfilled and order.get("status") in OPEN_STATUSES:
+            self._open[order["order_id"]] = (row, unfilled)
+            self.pending[row] += unfilled
+
+    def apply_fill(self, exchange, tradingsymbol, quantity, price, token=None):
+        """
+        Apply a fill to the book.
+
+        Args:
+            quantity (int): Signed filled quantity (positive for BUY, negative for SELL)
+            price (float): Fill price
+        """
+        with self._lock:
+            row = self._row(exchange, tradingsymbol, token)
+            held = self.quantity[row]
+            if held == 0 or np.sign(held) == np.sign(quantity):
+                # Opening or adding: blend the average price
+                self.average_price[row] = (held * self.average_price[row] + quantity * price) / (held + quantity)
+            else:
+                # Reducing or flipping: book P&L on the closed part
+                closed = min(abs(quantity), abs(held)) * np.sign(held)
+                self.realised[row] += closed * (price - self.average_price[row]) * self.multiplier[row]
+                if abs(quantity) > abs(held):
+                    self.average_price[row] = price
+            self.quantity[row] = held + quantity
+            self.last_price[row] = price
+
+    def on_order_update(self, order):
+        """
+        Handle an order update (KiteTicker on_order_update or postback payload).
+        Only the newly filled part of the order is applied.
+        """
+        with self._lock:
+            order_id = order["order_id"]
+            filled = order.get("filled_quantity") or 0
+            average = order.get("average_price") or 0
+            seen_qty, seen_avg = self._filled.setdefault(order_id, (0, 0))
+            self._track_open(order)
+            if filled <= seen_qty:
+                return
+            delta = filled - seen_qty
+            price = (average * filled - seen_avg * seen_qty) / delta
+            self._filled[order_id] = (filled, average)
+            sign = 1 if order["transaction_type"] == "BUY" else -1
+            self.apply_fill(order["exchange"], order["tradingsymbol"], sign * delta, price,
+                            order.get("instrument_token"))
+
+    def attach(self, ticker):
+        """
+        Feed fills from a KiteTicker's order-update stream into the cache.
+        """
+        ticker.on_order_update = lambda ws, data: self.on_order_update(data)
+
+    def update_marks(self, ltps):
+        """
+        Args:
+            ltps (dict): instrument_token -> last price (e.g. from a tick or quote cache)
+        """
+        if not ltps:
+            return
+        tokens = np.fromiter(ltps.keys(), dtype=np.int64, count=len(ltps))
+        prices = np.fromiter(ltps.values(), dtype=float, count=len(ltps))
+        order = np.argsort(tokens)
+        tokens, prices = tokens[order], prices[order]
+        with self._lock:
+            at = np.minimum(np.searchsorted(tokens, self.token), len(tokens) - 1)
+            hit = (tokens[at] == self.token) & (self.token != 0) & (prices[at] > 0)
+            self.last_price[hit] = prices[at][hit]
+
+    def mtm(self):
+        """
+        Returns:
+            dict: realised, unrealised and total P&L across the book
+        """
+        with self._lock:
+            unrealised = float(np.sum((self.last_price - self.average_price) * self.quantity * self.multiplier))
+            realised = float(self.realised.sum())
+        return {"realised": realised, "unrealised": unrealised, "total": realised + unrealised}
+
+    def gross_exposure(self):
+        with self._lock:
+            return float(np.sum(np.abs((self.quantity + self.pending) * self.last_price * self.multiplier)))
+
+    def net_quantity(self, exchange, tradingsymbol, include_pending=True):
+        with self._lock:
+            row = self.rows.get((exchange, tradingsymbol))
+            if row is None:
+                return 0
+            return int(self.quantity[row] + (self.pending[row] if include_pending else 0))
+
+    def check_order(self, exchange, tradingsymbol, direction, quantity, price=None,
+                    max_quantity=None, max_exposure=None):
+        """
+        Pre-trade check against the cached book. Open orders count as if filled.
+        An exposure check on an instrument with no price (neither given nor
+        marked) fails.
+
+        Args:
+            max_quantity (int): Largest absolute net quantity allowed per symbol after the order
+            max_exposure (float): Largest gross notional allowed across the book after the order
+
+        Returns:
+            tuple: (ok, reason)
+        """
+        signed = quantity if direction == "BUY" else -quantity
+        with self._lock:
+            row = self.rows.get((exchange, tradingsymbol))
+            if max_quantity is not None:
+                after = self.net_quantity(exchange, tradingsymbol) + signed
+                if abs(after) > max_quantity:
+                    return False, f"net quantity {after} exceeds {max_quantity} for {tradingsymbol}"
+            if max_exposure is not None:
+                mark = price or (self.last_price[row] if row is not None else 0)
+                if not mark:
+                    return False, f"no price to value {tradingsymbol} against the exposure limit"
+                multiplier = self.multiplier[row] if row is not None else 1
+                exposure = self.gross_exposure() + abs(signed * mark * multiplier)
+                if exposure > max_exposure:
+                    return False, f"gross exposure {exposure:,.0f} exceeds {max_exposure:,.0f}"
+        return True, ""
+
+    def record_order(self, order_id, exchange, tradingsymbol, direction, quantity, price=None, token=None):
+        """
+        Count an order we just placed as pending until its fills arrive.
+        If the order-update stream (or a refresh) already reported the order,
+        that state wins and only the mark is set.
+
+        Args:
+            price (float): Limit price; marks an instrument that has no price yet
+                so the pending quantity counts towards gross exposure
+            token (int): Instrument token, so update_marks() can find the row
+        """
+        with self._lock:
+            if order_id not in self._filled:
+                self._track_open({
+                    "order_id": order_id, "exchange": exchange, "tradingsymbol": tradingsymbol,
+                    "instrument_token": token, "transaction_type": direction, "quantity": quantity,
+                    "filled_quantity": 0, "status": "OPEN",
+                })
+            row = self._row(exchange, tradingsymbol, token)
+            if price and not self.last_price[row]:
+                self.last_price[row] = price
+
+    def release_order(self, order_id):
+        """
+        Stop counting an order as pending, e.g. a reservation made before the
+        order was sent. Unknown ids are ignored.
+        """
+        with self._lock:
+            previous = self._open.pop(order_id, None)
+            if previous is not None:
+                self.pending[previous[0]] -= previous[1]
+
+
+# Usage:
+# positions = PositionCache(kite, refresh_interval=60)
+# positions.refresh()
+# positions.attach(kws)   # kws = KiteTicker(api_key, access_token); fills now update the book
+# positions.update_marks({quote["instrument_token"]: quote["last_price"] for quote in quotes.values()})
+# ok, reason = positions.check_order("NFO", "BANKNIFTY25OCT50000CE", "BUY", 30, max_quantity=300)
@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """A kite.quote() call in progress that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class QuoteCache:
+    """
+    Short-TTL cache in front of kite.quote() with single-flight coalescing.
+
+    Entries are stored by instrument token; "EXCHANGE:SYMBOL" keys are mapped to
+    their token the first time a quote for them comes back. Concurrent callers
+    asking for an instrument that is already being fetched wait for that request
+    instead of issuing their own.
+
+    Args:
+        kite: Logged-in KiteConnect instance
+        ttl_ms (int): How long a quote stays fresh, in milliseconds (100-500 is typical)
+        max_entries (int): Maximum number of cached instruments; least recently used are evicted first
+    """
+
+    def __init__(self, kite, ttl_ms=250, max_entries=1024):
+        self.kite = kite
+        self.ttl = ttl_ms / 1000.0
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # token -> (fetched_at, quote)
+        self._tokens = {}  # "EXCHANGE:SYMBOL" -> token
+        self._inflight = {}  # requested key -> _Flight
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _token_for(self, key):
+        if isinstance(key, int) or str(key).isdigit():
+            return int(key)
+        return self._tokens.get(key)
+
+    def _fresh(self, key, now):
+        token = self._token_for(key)
+        if token is None:
+            return None
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        fetched_at, quote = entry
+        if now - fetched_at > self.ttl:
+            del self._entries[token]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(token)
+        return quote
+
+    def _store(self, key, quote, now):
+        token = quote.get("instrument_token")
+        if token is None:
+            token = self._token_for(key)
+        if token is None:
+            return
+        if not (isinstance(key, int) or str(key).isdigit()):
+            self._tokens[key] = token
+        self._entries[token] = (now, quote)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def quote(self, *instruments):
+        """
+        Drop-in replacement for kite.quote() that serves fresh entries from cache.
+
+        Args:
+            instruments: "EXCHANGE:SYMBOL" strings or instrument tokens
+        Returns:
+            Dictionary keyed like kite.quote() (str of each requested instrument)
+        """
+        keys = [str(i) for i in instruments]
+        result = {}
+        waiting = {}
+        to_fetch = []
+
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                quote = self._fresh(key, now)
+                if quote is not None:
+                    self.hits += 1
+                    result[key] = quote
+                elif key in self._inflight:
+                    self.coalesced += 1
+                    waiting[key] = self._inflight[key]
+                else:
+                    self.misses += 1
+                    flight = _Flight()
+                    self._inflight[key] = flight
+                    to_fetch.append(key)
+
+        if to_fetch:
+            try:
+                fetched = self.kite.quote(*to_fetch)
+            except Exception as e:
+                with self._lock:
+                    for key in to_fetch:
+                        flight = self._inflight.pop(key)
+                        flight.error = e
+                        flight.done.set()
+                raise
+            with self._lock:
+                now = time.monotonic()
+                for key in to_fetch:
+                    quote = fetched.get(key)
+                    if quote is not None:
+                        self._store(key, quote, now)
+                        result[key] = quote
+                    flight = self._inflight.pop(key)
+                    flight.result = quote
+                    flight.done.set()
+
+        for key, flight in waiting.items():
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.result is not None:
+                result[key] = flight.result
+
+        return result
+
+    def invalidate(self, *instruments):
+        """Drop cached quotes for the given instruments, or everything if none are given."""
+        with self._lock:
+            if not instruments:
+                self._entries.clear()
+                return
+            for key in instruments:
+                token = self._token_for(str(key))
+                if token is not None:
+                    self._entries.pop(token, None)
+
+    def stats(self):
+        """
+        Returns:
+            Dictionary with hit/miss/coalesced/eviction counters and current size
+        """
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,326 @@
+import numpy as np
+import pandas as pd
+
+# Columns a pending batch is expected to carry; rules only read what they need.
+#   row, exchange, symbol, direction, quantity   - from the order source
+#   price, ltp                                   - limit price and last price from the quote
+#   lot_size                                     - from the instrument dump (1 for equity)
+#   net_quantity                                 - current net position incl. open orders
+BATCH_COLUMNS = ["row", "exchange", "symbol", "direction", "quantity", "price", "ltp", "lot_size", "net_quantity"]
+
+
+def _signed_quantity(batch):
+    return np.where(batch["direction"].to_numpy() == "BUY", 1, -1) * batch["quantity"].to_numpy(dtype=float)
+
+
+def _symbols(batch):
+    return (batch["exchange"].astype(str) + ":" + batch["symbol"].astype(str)).to_numpy()
+
+
+def _mark(batch):
+    # Value positions at LTP, or at the limit price when there is no LTP
+    return batch["ltp"].fillna(batch["price"]).to_numpy(dtype=float)
+
+
+def _running_limit(allowed, delta, breaches, groups=None):
+    """
+    Flag rows whose running total breaches a limit, counting only rows that go out.
+
+    The running total before a row is the sum of delta over every earlier row
+    that is still allowed and not itself flagged (a rejected order never
+    reaches the book).
+
+    Args:
+        allowed (ndarray): Rows still allowed by earlier rules
+        delta (ndarray): What each row adds to the running total
+        breaches: Callable (rows, before, after) -> bool array, True where the row
+            takes the total from before to after and that breaks the limit
+        groups (ndarray): Optional label per row (e.g. symbol) to keep one running total per label
+
+    Returns:
+        ndarray: True for every allowed row that breaches the limit
+    """
+    rows = np.arange(len(delta))
+    contribution = np.where(allowed, delta, 0.0)
+    if groups is None:
+        running = np.cumsum(contribution)
+    else:
+        running = pd.Series(contribution).groupby(groups).cumsum().to_numpy()
+    before = running - contribution
+    flagged = breaches(rows, before, before + delta) & allowed
+    if not flagged.any():
+        # No allowed row drops out, so the vectorized totals are exact
+        return flagged
+
+    # A flagged row must not count towards later ones: walk the allowed rows in order
+    flagged = np.zeros(len(delta), dtype=bool)
+    totals = {}
+    for row in rows[allowed]:
+        key = groups[row] if groups is not None else None
+        total = totals.get(key, 0.0)
+        if breaches(np.array([row]), np.array([total]), np.array([total + delta[row]]))[0]:
+            flagged[row] = True
+        else:
+            totals[key] = total + delta[row]
+    return flagged
+
+
+def _grows_past(limit, before, after):
+    # Over the limit and further from flat than before; orders that reduce a position always pass
+    return (np.abs(after) > limit) & (np.abs(after) > np.abs(before))
+
+
+class Rule:
+    """
+    A pre-trade check over a whole batch. Subclasses return a boolean array
+    that is True for every row violating the rule.
+
+    Rows lacking an input the rule needs (e.g. no quote yet) fail closed:
+    missing() flags them before violations() is asked.
+    """
+
+    reason = "rule violated"
+    needs = ()  # batch columns the rule cannot decide without
+
+    def missing(self, batch):
+        if not self.needs:
+            return np.zeros(len(batch), dtype=bool)
+        return batch[list(self.needs)].isna().any(axis=1).to_numpy()
+
+    def missing_reason(self):
+        return f"no {' or '.join(self.needs)} to check {self.reason}"
+
+    def violations(self, batch, allowed):
+        """
+        Args:
+            batch (DataFrame): The pending batch
+            allowed (ndarray): Rows no earlier rule rejected; only these count towards running totals
+        """
+        raise NotImplementedError
+
+
+class ValidOrder(Rule):
+    """
+    Direction other than BUY/SELL (e.g. a 'BYU' typo) or a quantity that is
+    not positive. Every other rule assumes well-formed rows, so RiskGate runs
+    this one first unless told not to.
+    """
+
+    reason = "direction must be BUY or SELL and quantity above 0"
+
+    def violations(self, batch, allowed):
+        direction = batch["direction"].to_numpy()
+        quantity = batch["quantity"].to_numpy(dtype=float)
+        return ~np.isin(direction, ["BUY", "SELL"]) | ~(quantity > 0)
+
+
+class MaxNotional(Rule):
+    needs = ("price",)
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.reason = f"notional above {limit:,.0f}"
+
+    def violations(self, batch, allowed):
+        return batch["quantity"].to_numpy(dtype=float) * batch["price"].to_numpy(dtype=float) > self.limit
+
+
+class MaxLots(Rule):
+    needs = ("lot_size",)
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.reason = f"more than {limit} lots"
+
+    def violations(self, batch, allowed):
+        lots = batch["quantity"].to_numpy(dtype=float) / batch["lot_size"].to_numpy(dtype=float)
+        return lots > self.limit
+
+
+class LotMultiple(Rule):
+    reason = "quantity is not a multiple of the lot size"
+    needs = ("lot_size",)
+
+    def violations(self, batch, allowed):
+        lot_size = batch["lot_size"].to_numpy(dtype=float)
+        return np.mod(batch["quantity"].to_numpy(dtype=float), lot_size) != 0
+
+
+class PriceBand(Rule):
+    """
+    Limit price more than pct away from LTP.
+    """
+
+    needs = ("price", "ltp")
+
+    def __init__(self, pct):
+        self.pct = pct
+        self.reason = f"price more than {pct:.1%} from LTP"
+
+    def missing(self, batch):
+        return super().missing(batch) | ~(batch["ltp"].to_numpy(dtype=float) > 0)
+
+    def violations(self, batch, allowed):
+        price = batch["price"].to_numpy(dtype=float)
+        ltp = batch["ltp"].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            off = np.abs(price - ltp) / ltp
+        return off > self.pct
+
+
+class DuplicateRows(Rule):
+    """
+    Same symbol, direction and quantity as an earlier row in the batch that goes out.
+    """
+
+    reason = "duplicate of an earlier row"
+
+    def violations(self, batch, allowed):
+        duplicated = np.zeros(len(batch), dtype=bool)
+        duplicated[allowed] = batch[allowed].duplicated(["exchange", "symbol", "direction", "quantity"]).to_numpy()
+        return duplicated
+
+
+class MaxSymbolQuantity(Rule):
+    """
+    Net quantity per symbol after this row (position + earlier allowed rows in the batch) above the limit.
+    Rows that bring the net quantity closer to flat are always allowed.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.reason = f"net quantity per symbol above {limit}"
+
+    def violations(self, batch, allowed):
+        net = batch["net_quantity"].fillna(0).to_numpy(dtype=float)
+        return _running_limit(allowed, _signed_quantity(batch),
+                              lambda rows, before, after: _grows_past(self.limit, net[rows] + before, net[rows] + after),
+                              groups=_symbols(batch))
+
+
+class MaxSymbolExposure(Rule):
+    """
+    Gross notional per symbol after this row above the limit.
+    Rows that reduce the symbol's exposure are always allowed.
+    """
+
+    needs = ("ltp", "price")
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.reason = f"exposure per symbol above {limit:,.0f}"
+
+    def missing(self, batch):
+        return np.isnan(_mark(batch))
+
+    def violations(self, batch, allowed):
+        net = batch["net_quantity"].fillna(0).to_numpy(dtype=float)
+        mark = _mark(batch)
+        return _running_limit(allowed, _signed_quantity(batch),
+                              lambda rows, before, after: _grows_past(self.limit, (net[rows] + before) * mark[rows],
+                                                                      (net[rows] + after) * mark[rows]),
+                              groups=_symbols(batch))
+
+
+class MaxGrossExposure(Rule):
+    """
+    Book-wide gross notional (existing book plus the allowed rows so far) above the limit.
+
+    Each row changes gross exposure by |net + running + signed| - |net + running|
+    at its mark, so a row closing or reducing a position lowers it and is
+    always allowed.
+
+    Args:
+        limit (float): Largest gross notional allowed
+        existing: Callable returning the current gross exposure of the book
+    """
+
+    needs = ("ltp", "price")
+
+    def __init__(self, limit, existing=lambda: 0.0):
+        self.limit = limit
+        self.existing = existing
+        self.reason = f"gross exposure above {limit:,.0f}"
+
+    def missing(self, batch):
+        return np.isnan(_mark(batch))
+
+    def violations(self, batch, allowed):
+        existing = self.existing()
+        signed = _signed_quantity(batch)
+        net = batch["net_quantity"].fillna(0).to_numpy(dtype=float)
+        mark = _mark(batch)
+        groups = _symbols(batch)
+
+        contribution = np.where(allowed, signed, 0.0)
+        held = net + pd.Series(contribution).groupby(groups).cumsum().to_numpy() - contribution
+        change = (np.abs(held + signed) - np.abs(held)) * mark
+        total = existing + np.cumsum(np.where(allowed, change, 0.0))
+        flagged = allowed & (change > 0) & (total > self.limit)
+        if not flagged.any():
+            # No allowed row drops out, so the vectorized totals are exact
+            return flagged
+
+        # A flagged row changes neither its symbol's position nor the book: walk the allowed rows in order
+        flagged = np.zeros(len(batch), dtype=bool)
+        positions = {}
+        for row in np.flatnonzero(allowed):
+            held = positions.get(groups[row], net[row])
+            change = (abs(held + signed[row]) - abs(held)) * mark[row]
+            if change > 0 and existing + change > self.limit:
+                flagged[row] = True
+            else:
+                positions[groups[row]] = held + signed[row]
+                existing += change
+        return flagged
+
+
+class RiskGate:
+    """
+    Runs a list of rules over a pending batch before anything is sent.
+
+    Rules run in order, each as one vectorized pass over the rows earlier
+    rules allowed, so a rejected row never counts towards the running totals
+    of later rows. A row is rejected with the reason of the first rule it
+    fails. A row missing data a rule needs (no quote, unknown lot size) fails
+    closed with retry=True: the condition is transient, so the caller should
+    check it again next cycle instead of rejecting it for good.
+
+    Args:
+        rules (list): Rule instances, checked in order
+        validate (bool): Check ValidOrder before the given rules
+    """
+
+    def __init__(self, rules, validate=True):
+        self.rules = ([ValidOrder()] if validate else []) + list(rules)
+
+    def evaluate(self, batch):
+        """
+        Args:
+            batch (DataFrame): Pending orders with the BATCH_COLUMNS the rules need
+
+        Returns:
+            DataFrame: The batch with 'allowed', 'reason' and 'retry' columns added
+        """
+        batch = batch.reset_index(drop=True)
+        if not self.rules or batch.empty:
+            return batch.assign(allowed=True, reason="", retry=False)
+        allowed = np.ones(len(batch), dtype=bool)
+        retry = np.zeros(len(batch), dtype=bool)
+        reasons = np.full(len(batch), "", dtype=object)
+        for rule in self.rules:
+            missing = rule.missing(batch) & allowed
+            reasons[missing] = rule.missing_reason()
+            retry |= missing
+            allowed &= ~missing
+            violated = rule.violations(batch, allowed) & allowed
+            reasons[violated] = rule.reason
+            allowed &= ~violated
+        return batch.assign(allowed=allowed, reason=reasons, retry=retry)
+
+
+# Usage:
+# gate = RiskGate([MaxNotional(500_000), MaxLots(10), PriceBand(0.05), DuplicateRows(), MaxSymbolQuantity(1800)])
+# checked = gate.evaluate(batch)
+# for order in checked[checked["allowed"]].itertuples(): ...
+# checked[checked["retry"]]   # rows to check again next cycle (missing quote or lot size)
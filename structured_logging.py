@@ -0,0 +1,161 @@
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+
+# Fields set with log_context() are attached to every record logged inside it
+_context = contextvars.ContextVar("log_context", default={})
+
+# Attributes every LogRecord has; anything else on a record came from extra= or the context
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    Attach fields (e.g. correlation_id, row, order_id) to every record logged inside the block.
+    """
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def bind(**fields):
+    """
+    Add fields to the current context, e.g. the order_id once the broker returns it.
+    """
+    _context.set({**_context.get(), **fields})
+
+
+class ContextFilter(logging.Filter):
+    def filter(self, record):
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, msg plus any context/extra fields.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="microseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        elif record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to a background thread through a bounded queue.
+
+    The caller never blocks: when the queue is full the record is dropped and
+    counted, and a warning with the number of dropped records is logged once
+    there is room again.
+    """
+
+    def __init__(self, max_queue=10000):
+        super().__init__(queue.Queue(maxsize=max_queue))
+        self.dropped = 0
+        self._reported = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        # Only resolve what cannot cross threads; JSON formatting happens in the listener
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        if self.dropped > self._reported:
+            with self._lock:
+                missed = self.dropped - self._reported
+                self._reported = self.dropped
+            notice = logging.makeLogRecord({
+                "name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                "msg": f"Log queue full, dropped {missed} records", "dropped_total": self.dropped,
+            })
+            try:
+                self.queue.put_nowait(notice)
+            except queue.Full:
+                pass
+
+    def stats(self):
+        return {"queued": self.queue.qsize(), "capacity": self.queue.maxsize, "dropped": self.dropped}
+
+
+_handler = None
+_listener = None
+
+
+def setup_logging(level=logging.INFO, stream=None, path=None, max_queue=10000):
+    """
+    Route all logging through a bounded queue to a background JSON writer.
+
+    Logging calls on the order path only enqueue a record; stdout and file
+    writes happen on the listener thread.
+
+    Args:
+        level (int): Root log level
+        stream: Stream for JSON lines, defaults to stdout (None and path set: file only)
+        path (str): Optional file to append JSON lines to
+        max_queue (int): Records buffered before new ones are dropped
+
+    Returns:
+        BoundedQueueHandler: The installed handler (see .stats() for drop counts)
+    """
+    global _handler, _listener
+    if _handler is not None:
+        return _handler
+
+    formatter = JsonFormatter()
+    targets = []
+    if stream is not None or path is None:
+        targets.append(logging.StreamHandler(stream or sys.stdout))
+    if path is not None:
+        targets.append(logging.FileHandler(path))
+    for target in targets:
+        target.setFormatter(formatter)
+
+    _handler = BoundedQueueHandler(max_queue=max_queue)
+    _handler.addFilter(ContextFilter())
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(_handler.queue, *targets, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _handler
@@ -0,0 +1,110 @@
+import json
+import os
+import socket
+
+import pytest
+
+from order_intake import SocketIntake, SpoolIntake
+
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def socket_intake(tmp_path):
+    intake = SocketIntake(TOKEN, path=str(tmp_path / "orders.sock"))
+    yield intake
+    intake.close()
+
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def connect(intake):
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(5)
+    conn.connect(intake.address)
+    return conn
+
+
+def test_socket_needs_a_token():
+    with pytest.raises(ValueError):
+        SocketIntake("")
+
+
+def test_socket_is_owner_only(socket_intake):
+    assert os.stat(socket_intake.address).st_mode & 0o777 == 0o600
+
+
+def test_socket_order_is_answered_on_its_connection(socket_intake):
+    with connect(socket_intake) as conn:
+        conn.sendall(f"AUTH {TOKEN}\nSBIN,BUY,100\n".encode("utf-8"))
+        batch = socket_intake.poll(timeout=5)
+        assert [(o.symbol, o.direction, o.quantity) for o in batch.orders] == [("SBIN", "BUY", 100)]
+        socket_intake.mark(batch.orders[0], ["Order_Placed", "2026-01-01 09:15:00", "240101000000001"])
+        reply = json.loads(conn.makefile("rb").readline())
+    assert reply == {"seq": 1, "symbol": "SBIN", "status": "Order_Placed",
+                     "timestamp": "2026-01-01 09:15:00", "detail": "240101000000001"}
+
+
+def test_socket_drops_http_requests(socket_intake):
+    with connect(socket_intake) as conn:
+        conn.sendall(b"POST / HTTP/1.1\r\nHost: localhost\r\n\r\nSBIN,BUY,100\n")
+        assert conn.recv(1024) == b""
+    assert socket_intake.poll(timeout=0.2).orders == []
+
+
+def test_socket_rejects_a_wrong_token(socket_intake):
+    with connect(socket_intake) as conn:
+        conn.sendall(b"AUTH wrong\nSBIN,BUY,100\n")
+        assert json.loads(conn.makefile("rb").readline()) == {"status": "Unauthorized"}
+    assert socket_intake.poll(timeout=0.2).orders == []
+
+
+def test_spool_recovers_files_left_in_inflight(tmp_path):
+    intake = SpoolIntake(str(tmp_path))
+    write(tmp_path / "inflight" / "orders.csv", "symbol,direction,quantity\nSBIN,BUY,100\nINFY,SELL,5\n")
+    write(tmp_path / "done" / "orders.csv.status.jsonl", json.dumps({"line": 2, "status": "Order_Placed"}) + "\n")
+    batch = intake.poll(timeout=0)
+    # Line 2 already has an outcome from before the restart
+    assert [(o.symbol, o.row) for o in batch.orders] == [("INFY", 3)]
+    assert (tmp_path / "inflight" / "orders.csv").exists()
+    intake.mark(batch.orders[0], ["Order_Placed", "2026-01-01 09:15:00", "240101000000002"])
+    assert (tmp_path / "done" / "orders.csv").exists()
+    assert not (tmp_path / "inflight" / "orders.csv").exists()
+    intake.close()
+
+
+def test_spool_finishes_recovered_file_with_every_line_marked(tmp_path):
+    intake = SpoolIntake(str(tmp_path))
+    write(tmp_path / "inflight" / "orders.jsonl", '{"symbol": "SBIN", "direction": "BUY", "quantity": 1}\n')
+    write(tmp_path / "done" / "orders.jsonl.status.jsonl", json.dumps({"line": 1, "status": "Order_Placed"}) + "\n")
+    assert intake.poll(timeout=0).orders == []
+    assert (tmp_path / "done" / "orders.jsonl").exists()
+    intake.close()
+
+
+def test_spool_waits_for_a_file_to_be_finished(tmp_path):
+    intake = SpoolIntake(str(tmp_path), poll_every=0.005)
+    path = tmp_path / "orders.csv"
+    # The writer has flushed only part of "SBIN,BUY,100\n"
+    write(path, "SBIN,BUY,1")
+    assert intake.poll(timeout=0.05).orders == []
+    assert path.exists()
+    with open(path, "a") as f:
+        f.write("00\n")
+    batch = intake.poll(timeout=1)
+    assert [(o.symbol, o.quantity) for o in batch.orders] == [("SBIN", 100)]
+    intake.close()
+
+
+def test_spool_ignores_dotfiles_and_temporary_names(tmp_path):
+    intake = SpoolIntake(str(tmp_path), poll_every=0.005)
+    write(tmp_path / ".orders.csv", "SBIN,BUY,100\n")
+    write(tmp_path / "orders.csv.tmp", "SBIN,BUY,100\n")
+    assert intake.poll(timeout=0.05).orders == []
+    os.replace(tmp_path / "orders.csv.tmp", tmp_path / "orders.csv")
+    assert [o.tab for o in intake.poll(timeout=1).orders] == ["orders.csv"]
+    assert (tmp_path / ".orders.csv").exists()
+    intake.close()
@@ -0,0 +1,94 @@
+from position_cache import PositionCache, RESERVATION_PREFIX
+
+
+def order_update(order_id, status, filled, average=0.0, quantity=50, direction="BUY", symbol="X"):
+    return {"order_id": order_id, "exchange": "NFO", "tradingsymbol": symbol, "transaction_type": direction,
+            "quantity": quantity, "filled_quantity": filled, "average_price": average, "status": status}
+
+
+class FakeKite:
+    """Serves queued positions/orders snapshots, one per call."""
+
+    def __init__(self, positions, orders):
+        self._positions = list(positions)
+        self._orders = list(orders)
+
+    def positions(self):
+        return {"net": self._positions.pop(0) if len(self._positions) > 1 else self._positions[0]}
+
+    def orders(self):
+        return self._orders.pop(0) if len(self._orders) > 1 else self._orders[0]
+
+
+def test_fills_blend_average_and_book_realised():
+    cache = PositionCache(kite=None)
+    cache.apply_fill("NFO", "X", 50, 100.0)
+    cache.apply_fill("NFO", "X", 50, 110.0)
+    cache.apply_fill("NFO", "X", -60, 120.0)
+    row = cache.rows[("NFO", "X")]
+    assert cache.quantity[row] == 40
+    assert cache.average_price[row] == 105.0
+    assert cache.realised[row] == 60 * 15.0
+
+
+def test_partial_fills_apply_only_the_new_part():
+    cache = PositionCache(kite=None)
+    cache.on_order_update(order_update("1", "OPEN", 20, 100.0))
+    cache.on_order_update(order_update("1", "COMPLETE", 50, 106.0))
+    cache.on_order_update(order_update("1", "COMPLETE", 50, 106.0))
+    row = cache.rows[("NFO", "X")]
+    assert cache.quantity[row] == 50
+    assert cache.average_price[row] == 106.0
+    assert cache.net_quantity("NFO", "X") == 50
+
+
+def test_record_order_after_stream_update_does_not_double_count():
+    cache = PositionCache(kite=None)
+    cache.on_order_update(order_update("1", "COMPLETE", 50, 100.0))
+    cache.record_order("1", "NFO", "X", "BUY", 50, price=100.0)
+    assert cache.net_quantity("NFO", "X") == 50
+
+
+def test_record_order_after_rejection_adds_nothing():
+    cache = PositionCache(kite=None)
+    cache.on_order_update(order_update("1", "REJECTED", 0))
+    cache.record_order("1", "NFO", "X", "BUY", 50, price=100.0)
+    assert cache.net_quantity("NFO", "X") == 0
+
+
+def test_record_order_counts_pending_and_marks_new_instrument():
+    cache = PositionCache(kite=None)
+    cache.record_order("1", "NFO", "X", "SELL", 50, price=100.0)
+    assert cache.net_quantity("NFO", "X") == -50
+    assert cache.gross_exposure() == 5000.0
+    cache.on_order_update(order_update("1", "COMPLETE", 50, 101.0, direction="SELL"))
+    assert cache.net_quantity("NFO", "X") == -50
+    assert cache.net_quantity("NFO", "X", include_pending=False) == -50
+
+
+def test_refresh_rereads_when_a_fill_lands_between_snapshots():
+    before = [order_update("1", "OPEN", 0)]
+    after = [order_update("1", "COMPLETE", 50, 100.0)]
+    position = {"exchange": "NFO", "tradingsymbol": "X", "quantity": 50, "average_price": 100.0}
+    # First positions read already has the fill, the order book only on the second read
+    kite = FakeKite(positions=[[position], [position]], orders=[before, after, after])
+    cache = PositionCache(kite)
+    cache.refresh()
+    assert cache.net_quantity("NFO", "X") == 50
+    # The stream delivering the same fill afterwards changes nothing
+    cache.on_order_update(after[0])
+    assert cache.net_quantity("NFO", "X") == 50
+
+
+def test_reservations_survive_refresh():
+    position = {"exchange": "NFO", "tradingsymbol": "X", "quantity": 100, "average_price": 100.0, "last_price": 100.0}
+    cache = PositionCache(FakeKite(positions=[[position]], orders=[[]]))
+    cache.refresh()
+    cache.record_order(RESERVATION_PREFIX + "sheet:Place_Orders!2", "NFO", "X", "BUY", 1000, price=100.0)
+    cache.record_order(RESERVATION_PREFIX + "sheet:Place_Orders!3", "NFO", "Y", "SELL", 50, price=20.0, token=7)
+    cache.refresh()
+    assert cache.net_quantity("NFO", "X") == 1100
+    assert cache.net_quantity("NFO", "Y") == -50
+    assert cache.gross_exposure() == 1100 * 100.0 + 50 * 20.0
+    cache.release_order(RESERVATION_PREFIX + "sheet:Place_Orders!2")
+    assert cache.net_quantity("NFO", "X") == 100
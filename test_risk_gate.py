@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+from risk_gate import (RiskGate, ValidOrder, MaxNotional, MaxLots, LotMultiple, PriceBand, DuplicateRows,
+                       MaxSymbolQuantity, MaxSymbolExposure, MaxGrossExposure)
+
+
+def make_batch(*rows):
+    """rows: (symbol, direction, quantity) with optional dict of column overrides."""
+    records = []
+    for i, row in enumerate(rows):
+        symbol, direction, quantity = row[:3]
+        record = {"row": i + 2, "exchange": "NFO", "symbol": symbol, "direction": direction,
+                  "quantity": quantity, "price": 100.0, "ltp": 100.0, "lot_size": 15.0, "net_quantity": 0}
+        if len(row) > 3:
+            record.update(row[3])
+        records.append(record)
+    return pd.DataFrame(records)
+
+
+def test_rejected_row_does_not_count_towards_symbol_quantity():
+    checked = RiskGate([MaxSymbolQuantity(1800)]).evaluate(make_batch(
+        ("X", "BUY", 5000),
+        ("X", "BUY", 50),
+    ))
+    assert checked["allowed"].tolist() == [False, True]
+
+
+def test_rejected_sell_does_not_offset_later_buys():
+    # Without the oversized SELL the BUYs have to fit on their own
+    checked = RiskGate([MaxSymbolQuantity(100)]).evaluate(make_batch(
+        ("X", "SELL", 500),
+        ("X", "BUY", 80),
+        ("X", "BUY", 80),
+    ))
+    assert checked["allowed"].tolist() == [False, True, False]
+
+
+def test_rejected_row_does_not_count_towards_exposure():
+    checked = RiskGate([MaxSymbolExposure(10_000), MaxGrossExposure(15_000)]).evaluate(make_batch(
+        ("X", "BUY", 500),
+        ("X", "BUY", 50),
+        ("Y", "BUY", 60),
+        ("Z", "BUY", 60),
+    ))
+    assert checked["allowed"].tolist() == [False, True, True, False]
+    assert checked["reason"].tolist()[3] == "gross exposure above 15,000"
+
+
+def test_earlier_rule_rejections_are_masked_from_running_totals():
+    checked = RiskGate([MaxNotional(20_000), MaxSymbolQuantity(100)]).evaluate(make_batch(
+        ("X", "BUY", 300),
+        ("X", "BUY", 90),
+    ))
+    assert checked["allowed"].tolist() == [False, True]
+    assert checked["reason"].tolist()[0] == "notional above 20,000"
+
+
+def test_running_totals_start_from_position():
+    checked = RiskGate([MaxSymbolQuantity(100)]).evaluate(make_batch(
+        ("X", "BUY", 30, {"net_quantity": 60}),
+        ("X", "BUY", 30, {"net_quantity": 60}),
+        ("Y", "BUY", 30),
+    ))
+    assert checked["allowed"].tolist() == [True, False, True]
+
+
+def test_missing_data_fails_closed_and_is_retried():
+    checked = RiskGate([MaxNotional(1e9), MaxLots(100), PriceBand(0.05), MaxGrossExposure(1e12)]).evaluate(make_batch(
+        ("A", "BUY", 15, {"price": np.nan}),
+        ("B", "BUY", 15, {"lot_size": np.nan}),
+        ("C", "BUY", 15, {"ltp": np.nan}),
+        ("D", "BUY", 15, {"price": np.nan, "ltp": np.nan}),
+        ("E", "BUY", 15),
+    ))
+    assert checked["allowed"].tolist() == [False, False, False, False, True]
+    assert checked["retry"].tolist() == [True, True, True, True, False]
+
+
+def test_limit_breach_is_not_retried():
+    checked = RiskGate([MaxLots(2), LotMultiple()]).evaluate(make_batch(
+        ("A", "BUY", 45),
+        ("B", "BUY", 20),
+    ))
+    assert checked["allowed"].tolist() == [False, False]
+    assert checked["retry"].tolist() == [False, False]
+    assert checked["reason"].tolist() == ["more than 2 lots", "quantity is not a multiple of the lot size"]
+
+
+def test_duplicate_of_rejected_row_is_allowed():
+    checked = RiskGate([PriceBand(0.05), DuplicateRows()]).evaluate(make_batch(
+        ("X", "BUY", 15, {"price": 200.0}),
+        ("X", "BUY", 15),
+        ("X", "BUY", 15),
+    ))
+    assert checked["allowed"].tolist() == [False, True, False]
+
+
+def test_no_rules_allows_everything():
+    checked = RiskGate([]).evaluate(make_batch(("X", "BUY", 15, {"price": np.nan})))
+    assert checked["allowed"].tolist() == [True]
+    assert checked["retry"].tolist() == [False]
+
+
+def test_closing_sell_passes_gross_limit_near_the_cap():
+    # Book holds X long 100 @ 100 = 10,000 against a 10,500 cap
+    checked = RiskGate([MaxGrossExposure(10_500, existing=lambda: 10_000.0)]).evaluate(make_batch(
+        ("Y", "BUY", 10, {"net_quantity": 0}),
+        ("X", "SELL", 100, {"net_quantity": 100}),
+        ("Y", "BUY", 50, {"net_quantity": 0}),
+    ))
+    # The second Y buy only fits because the X exit freed room
+    assert checked["allowed"].tolist() == [False, True, True]
+
+
+def test_reducing_a_position_over_the_limit_is_allowed():
+    checked = RiskGate([MaxSymbolQuantity(100), MaxSymbolExposure(10_000)]).evaluate(make_batch(
+        ("X", "SELL", 50, {"net_quantity": 300}),
+        ("X", "BUY", 10, {"net_quantity": 300}),
+        ("X", "SELL", 600, {"net_quantity": 300}),
+    ))
+    # Flipping from +250 to -350 grows the position past the limit
+    assert checked["allowed"].tolist() == [True, False, False]
+
+
+def test_bad_direction_or_quantity_is_rejected_by_default():
+    checked = RiskGate([MaxNotional(1e9)]).evaluate(make_batch(
+        ("X", "BYU", 15),
+        ("X", "BUY", -5),
+        ("X", "SELL", 0),
+        ("X", "SELL", 15),
+    ))
+    assert checked["allowed"].tolist() == [False, False, False, True]
+    assert checked["retry"].tolist() == [False, False, False, False]
+    assert set(checked["reason"][:3]) == {ValidOrder.reason}
+
+
+def test_validation_can_be_turned_off():
+    checked = RiskGate([], validate=False).evaluate(make_batch(("X", "BYU", 15)))
+    assert checked["allowed"].tolist() == [True]
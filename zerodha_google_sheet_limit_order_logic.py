@@ -1,19 +1,46 @@
-from kiteconnect import KiteConnect
+from kiteconnect import KiteConnect, KiteTicker
+import logging
 import os
-import csv
+import threading
 import time
 from datetime import datetime
+import pandas as pd
 import gspread
 from google.oauth2.service_account import Credentials
 from google.auth.transport.requests import Request
+from structured_logging import setup_logging, log_context, bind
+from order_intake import SheetIntake, SpoolIntake, SocketIntake, run_intake
+from quote_cache import QuoteCache
+from instrument_index import InstrumentRefresher
+from position_cache import PositionCache, RESERVATION_PREFIX
+from risk_gate import RiskGate, MaxNotional, MaxLots, PriceBand, DuplicateRows, MaxSymbolQuantity, MaxSymbolExposure, MaxGrossExposure
+from order_pricing import detect_exchange, default_product, limit_price
+
+# JSON logs go through a bounded queue to a background writer, so order
+# placement never waits on stdout or disk
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Google Sheets setup
 scopes = ["https://www.googleapis.com/auth/spreadsheets"]
 
+SPREADSHEET_ID = '1xHoWl9HZdpuRVM9Mh_WLuPeeCd4CZAhIDpoeYVfvHTE'
+CONFIG_RANGE = 'Info!B1:B3'  # B1 api_key, B2 api_secret, B3 access token
+
+# Order tabs polled every cycle. Add tabs or spreadsheets here to let several
+# desks share this poller; each spreadsheet costs one read per cycle. An
+# optional "alias" names the spreadsheet in correlation ids (alias:tab!row).
+SHEET_SOURCES = [
+    {"spreadsheet_id": SPREADSHEET_ID, "tabs": ["Place_Orders"], "config_range": CONFIG_RANGE},
+]
+
+sheet_intake = None
+
 def get_credentials_from_sheet():
     """
     Get API credentials and access token from Google Sheet 'Info'
     """
+    global sheet_intake
     try:
         # Initialize Google Sheets API
         creds = Credentials.from_service_account_file(
@@ -22,35 +49,29 @@ def get_credentials_from_sheet():
         )
         
         client = gspread.authorize(creds)
+        sheet_intake = SheetIntake(client, SHEET_SOURCES)
         
-        # Open the spreadsheet and Info sheet
-        # Replace 'your_spreadsheet_name' with your actual spreadsheet name
-        spreadsheet = client.open_by_key('1xHoWl9HZdpuRVM9Mh_WLuPeeCd4CZAhIDpoeYVfvHTE')
-        info_sheet = spreadsheet.worksheet('Info')
-        
-        # Read API credentials from B column
-        api_key = info_sheet.acell('B1').value  # B1 for api_key
-        api_secret = info_sheet.acell('B2').value  # B2 for api_secret
+        # Read api_key, api_secret and access token (B1:B3) in a single call
+        cells = sheet_intake.read_config(SPREADSHEET_ID, CONFIG_RANGE)
+        api_key, api_secret, access_token = (cells + [None, None, None])[:3]
         
-        # Read access token from B column (B3)
-        access_token = info_sheet.acell('B3').value
-        
-        print("Successfully loaded credentials from Google Sheet")
+        logger.info("Successfully loaded credentials from Google Sheet")
         return api_key, api_secret, access_token
         
     except Exception as e:
-        print(f"Error reading from Google Sheet: {e}")
-        print("Please ensure you have:")
-        print("1. service_account.json file in the same directory")
-        print("2. Google Sheet with ID '1xHoWl9HZdpuRVM9Mh_WLuPeeCd4CZAhIDpoeYVfvHTE' with 'Info' sheet")
-        print("3. API credentials in B1, B2, and access token in B3")
+        logger.error(f"Error reading from Google Sheet: {e}")
+        logger.error("Please ensure you have:")
+        logger.error("1. service_account.json file in the same directory")
+        logger.error(f"2. Google Sheet with ID '{SPREADSHEET_ID}' with 'Info' sheet")
+        logger.error("3. API credentials in B1, B2, and access token in B3")
         return None, None, None
 
 # Get credentials from Google Sheet
 api_key, api_secret, access_token = get_credentials_from_sheet()
+sheet_access_token = access_token
 
 if not api_key or not api_secret:
-    print("Failed to load API credentials. Exiting...")
+    logger.error("Failed to load API credentials. Exiting...")
     exit()
 
 kite = KiteConnect(api_key=api_key)
@@ -64,10 +85,10 @@ def set_access_token_from_sheet():
         try:
             kite.set_access_token(access_token)
             kite.profile()
-            print("Using access token from Google Sheet.")
+            logger.info("Using access token from Google Sheet.")
             return True
         except Exception:
-            print("Access token from sheet is invalid or expired.")
+            logger.error("Access token from sheet is invalid or expired.")
             return False
     return False
 
@@ -77,7 +98,68 @@ if not set_access_token_from_sheet():
     data = kite.generate_session(request_token, api_secret=api_secret)
     access_token = data["access_token"]
     kite.set_access_token(access_token)
-    print("Access token set successfully")
+    logger.info("Access token set successfully")
+
+# Each batch is risk-checked on one batched quote call, and every row is
+# quoted again right before it is sent. Requests within 250ms share a quote,
+# so the first row reuses the batch quote and overlapping batches from
+# several intake backends share theirs; nothing older is ever sent.
+quote_cache = QuoteCache(kite, ttl_ms=250)
+
+# Instrument dumps are loaded from disk now and refreshed in the background,
+# so the poller never waits on a download
+instrument_refresher = InstrumentRefresher(["NSE", "NFO", "CDS"]).start()
+
+# Positions are loaded from the broker at most once a minute and kept current
+# with our own orders in between
+position_cache = PositionCache(kite, refresh_interval=60)
+
+# Apply fills from the order-update websocket as they happen. Marks come from
+# each batch's quotes and from the fills themselves.
+STREAM_ORDER_UPDATES = True
+
+
+def start_order_stream():
+    ticker = KiteTicker(api_key, access_token)
+    position_cache.attach(ticker)
+    ticker.on_error = lambda ws, code, reason: logger.warning(f"Order update stream error {code}: {reason}")
+    ticker.connect(threaded=True)
+    return ticker
+
+# Pre-trade risk limits, checked over each cycle's pending rows before anything
+# is sent. None disables a limit.
+MAX_NOTIONAL_PER_ORDER = None  # e.g. 500_000
+MAX_LOTS_PER_ORDER = None  # e.g. 20
+PRICE_BAND_PCT = None  # e.g. 0.05: limit price at most 5% away from LTP
+BLOCK_DUPLICATE_ROWS = False  # same symbol/direction/quantity twice in one cycle
+MAX_QUANTITY_PER_SYMBOL = None  # e.g. 1800: largest absolute net quantity per symbol
+MAX_EXPOSURE_PER_SYMBOL = None  # e.g. 1_000_000
+MAX_GROSS_EXPOSURE = None  # e.g. 5_000_000: largest gross notional across the book
+
+
+def build_risk_gate():
+    rules = []
+    if MAX_NOTIONAL_PER_ORDER is not None:
+        rules.append(MaxNotional(MAX_NOTIONAL_PER_ORDER))
+    if MAX_LOTS_PER_ORDER is not None:
+        rules.append(MaxLots(MAX_LOTS_PER_ORDER))
+    if PRICE_BAND_PCT is not None:
+        rules.append(PriceBand(PRICE_BAND_PCT))
+    if BLOCK_DUPLICATE_ROWS:
+        rules.append(DuplicateRows())
+    if MAX_QUANTITY_PER_SYMBOL is not None:
+        rules.append(MaxSymbolQuantity(MAX_QUANTITY_PER_SYMBOL))
+    if MAX_EXPOSURE_PER_SYMBOL is not None:
+        rules.append(MaxSymbolExposure(MAX_EXPOSURE_PER_SYMBOL))
+    if MAX_GROSS_EXPOSURE is not None:
+        rules.append(MaxGrossExposure(MAX_GROSS_EXPOSURE, existing=position_cache.gross_exposure))
+    return RiskGate(rules)
+
+risk_gate = build_risk_gate()
+
+# The rules that depend on the limit price, run again on a fresh quote right
+# before each order is sent
+price_gate = RiskGate([rule for rule in risk_gate.rules if isinstance(rule, (MaxNotional, PriceBand))])
 
 def get_instrument_token(exchange, trading_symbol):
     """
@@ -90,42 +172,19 @@ def get_instrument_token(exchange, trading_symbol):
     Returns:
         int or None: Instrument token if found, None otherwise
     """
-    try:
-        with open('instruments.csv', 'r') as file:
-            csv_reader = csv.reader(file)
-            next(csv_reader)  # Skip header row
-            
-            for row in csv_reader:
-                if len(row) >= 12:  # Ensure row has enough columns
-                    # Check if exchange and trading symbol match
-                    if row[11] == exchange and row[2] == trading_symbol:
-                        instrument_token = int(row[0])
-                        print(f"Found instrument token: {instrument_token} for {trading_symbol} on {exchange}")
-                        return instrument_token
-            
-            print(f"No instrument found for {trading_symbol} on {exchange}")
-            return None
-            
-    except FileNotFoundError:
-        print("instruments.csv file not found")
-        return None
-    except Exception as e:
-        print(f"Error reading instruments.csv: {e}")
+    index = instrument_refresher.index
+    if len(index) == 0:
+        logger.warning("Instrument dump not loaded yet")
         return None
+    instrument_token = index.token(exchange, trading_symbol)
+    if instrument_token is None:
+        logger.warning(f"No instrument found for {trading_symbol} on {exchange}")
+    return instrument_token
 
-def place_order(symbol, direction, quantity, product=None):
+def place_order(symbol, direction, quantity, product=None, quote_cache=None, price=None):
     # Automatically detect exchange based on symbol
-    if sum(1 for char in symbol if char.isdigit()) >= 2:
-        # Check if it's CDS (Currency Derivatives) first
-        if any(currency in symbol.upper() for currency in ['USDINR', 'EURINR', 'GBPINR', 'JPYINR', 'INR']):
-            exchange = "CDS"  # Currency derivatives
-            print(f"Auto-detected exchange: CDS for symbol {symbol}")
-        else:
-            exchange = "NFO"  # Other derivatives (options/futures)
-            print(f"Auto-detected exchange: NFO for symbol {symbol}")
-    else:
-        exchange = "NSE"  # No numbers = equity shares
-        print(f"Auto-detected exchange: NSE for symbol {symbol}")
+    exchange = detect_exchange(symbol)
+    logger.info(f"Auto-detected exchange: {exchange} for symbol {symbol}")
     
     exchanges = {"NSE": kite.EXCHANGE_NSE, "NFO": kite.EXCHANGE_NFO, "CDS": kite.EXCHANGE_CDS}
     directions = {"BUY": kite.TRANSACTION_TYPE_BUY, "SELL": kite.TRANSACTION_TYPE_SELL}
@@ -133,31 +192,27 @@ def place_order(symbol, direction, quantity, product=None):
     
     # Set default product based on exchange if not specified
     if product is None:
-        if exchange == "NSE":
-            product = "CNC"  # Cash and Carry for equity shares
-        elif exchange in ["NFO", "CDS"]:
-            product = "NRML"  # Normal margin for derivatives
-        print(f"Auto-setting product to {product} for {exchange} exchange")
+        product = default_product(exchange)
+        logger.info(f"Auto-setting product to {product} for {exchange} exchange")
     
-    # Always get the best price from quotes for LIMIT orders
-    try:
-        # Get quote for the symbol
-        quote_symbol = f"{exchange}:{symbol}"
-        quotes = kite.quote(quote_symbol)
-        
-        if direction == "BUY":
-            # For BUY order, use best bid price (what buyers are willing to pay)
-            best_price = quotes[quote_symbol]['depth']['buy'][0]['price']
-            print(f"Auto-setting BUY limit price to best bid: ₹{best_price}")
-        else:  # SELL
-            # For SELL order, use best ask price (what sellers are asking)
-            best_price = quotes[quote_symbol]['depth']['sell'][0]['price']
-            print(f"Auto-setting SELL limit price to best ask: ₹{best_price}")
-        
-    except Exception as e:
-        print(f"Error getting quote for price: {e}")
-        # Always return a tuple to avoid unpacking errors upstream
-        return None, None
+    # Use the caller's price (e.g. the risk-checked batch price) or the best price from quotes
+    if price is not None:
+        best_price = price
+        logger.info(f"Using {direction} limit price from batch quote: ₹{best_price}")
+    else:
+        try:
+            # Get quote for the symbol
+            quote_symbol = f"{exchange}:{symbol}"
+            quotes = (quote_cache or kite).quote(quote_symbol)
+
+            # BUY joins the best bid, SELL joins the best ask
+            best_price = limit_price(quotes[quote_symbol]['depth'], direction)
+            logger.info(f"Auto-setting {direction} limit price to best {'bid' if direction == 'BUY' else 'ask'}: ₹{best_price}")
+
+        except Exception as e:
+            logger.error(f"Error getting quote for price: {e}")
+            # Always return a tuple to avoid unpacking errors upstream
+            return None, None
     
     try:
         order_id = kite.place_order(
@@ -171,19 +226,20 @@ def place_order(symbol, direction, quantity, product=None):
             price=best_price,  # Use the fetched price
             validity=kite.VALIDITY_DAY
         )
-        print(f"Order placed: {order_id}")
+        logger.info(f"Order placed: {order_id}", extra={"order_id": order_id})
         return order_id, best_price
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error(f"Error: {e}")
         return None, None
 
 
-def get_quote(*args, order_type="BUY"):
+def get_quote(*args, order_type="BUY", quote_cache=None):
     """
     Get best quote for trading
     Args:
         args: Instrument symbols (exchange, symbol pairs OR full format)
         order_type: "BUY" (best ask), "SELL" (best bid) - defaults to "BUY"
+        quote_cache: Optional QuoteCache to reuse quotes fetched in the last few hundred ms
     Returns:
         Best prices for trading
     """
@@ -196,14 +252,14 @@ def get_quote(*args, order_type="BUY"):
         else:
             # Assume separate format: exchange, symbol pairs
             if len(args) % 2 != 0:
-                print("Error: Need even number of arguments for exchange, symbol pairs")
+                logger.error("Error: Need even number of arguments for exchange, symbol pairs")
                 return None
             for i in range(0, len(args), 2):
                 exchange = args[i]
                 stock = args[i + 1]
                 symbols.append(f"{exchange}:{stock}")
             
-        quotes = kite.quote(*symbols)
+        quotes = (quote_cache or kite).quote(*symbols)
         result = {}
         
         for symbol, data in quotes.items():
@@ -211,91 +267,229 @@ def get_quote(*args, order_type="BUY"):
                 # For BUY order, get best bid (buy price) - what buyers are willing to pay
                 best_price = data['depth']['buy'][0]['price']
                 best_qty = data['depth']['buy'][0]['quantity']
-                print(f"{symbol} - Best BID for BUY: ₹{best_price} (Qty: {best_qty})")
+                logger.info(f"{symbol} - Best BID for BUY: ₹{best_price} (Qty: {best_qty})")
             else:  # SELL
                 # For SELL order, get best ask (sell price) - what sellers are asking
                 best_price = data['depth']['sell'][0]['price']
                 best_qty = data['depth']['sell'][0]['quantity']
-                print(f"{symbol} - Best ASK for SELL: ₹{best_price} (Qty: {best_qty})")
+                logger.info(f"{symbol} - Best ASK for SELL: ₹{best_price} (Qty: {best_qty})")
             
             result[symbol] = {"price": best_price, "quantity": best_qty}
         return result
         
     except Exception as e:
-        print(f"Quote Error: {e}")
+        logger.error(f"Quote Error: {e}")
         return None
 
 
 
-def process_place_orders():
+def build_order_batch(orders):
     """
-    Read orders from Google Sheet 'Place_Orders' and process rows without status.
-    Columns:
-      A: symbol, B: direction (BUY/SELL), C: quantity, D: status, E: timestamp
-    Starts from row 2 (row 1 is header). If D == 'Order_Placed', skip.
+    Turn pending OrderRows into a risk-gate batch.
+
+    Limit prices and LTPs for every symbol come from one batched quote call.
+    The 'ref' column is the position of each order in the orders list.
     """
+    batch = pd.DataFrame({
+        "ref": range(len(orders)),
+        "row": [order.row for order in orders],
+        "symbol": [order.symbol for order in orders],
+        "direction": [order.direction for order in orders],
+        "quantity": [order.quantity for order in orders],
+    })
+    batch["exchange"] = [detect_exchange(symbol) for symbol in batch["symbol"]]
+    keys = [f"{exchange}:{symbol}" for exchange, symbol in zip(batch["exchange"], batch["symbol"])]
     try:
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] Polling Place_Orders...", flush=True)
-        creds = Credentials.from_service_account_file('service_account.json', scopes=scopes)
-        client = gspread.authorize(creds)
-        spreadsheet = client.open_by_key('1xHoWl9HZdpuRVM9Mh_WLuPeeCd4CZAhIDpoeYVfvHTE')
-        sheet = spreadsheet.worksheet('Place_Orders')
-
-        rows = sheet.get_all_values()
-        if len(rows) <= 1:
-            print("No data rows found (only header).", flush=True)
-            return
-        placed_count = 0
-        skipped_count = 0
-        invalid_count = 0
-        # rows[0] is header; start from index 1
-        for idx in range(1, len(rows)):
-            row = rows[idx]
-            # Safely access columns with defaults
-            symbol = row[0].strip() if len(row) > 0 else ""
-            direction = (row[1] or "").strip().upper() if len(row) > 1 else ""
-            quantity_str = (row[2] or "").strip() if len(row) > 2 else ""
-            status = (row[3] or "").strip().upper() if len(row) > 3 else ""
-
-            # Skip empty or already processed rows
-            if not symbol or not direction or not quantity_str:
-                invalid_count += 1
+        quotes = quote_cache.quote(*dict.fromkeys(keys))
+    except Exception as e:
+        logger.warning(f"Batch quote failed, rows whose checks need a price are deferred: {e}")
+        quotes = {}
+    # Fresh LTPs re-mark the book before exposure limits are checked
+    position_cache.update_marks({quote["instrument_token"]: quote["last_price"]
+                                 for quote in quotes.values() if quote.get("instrument_token")})
+
+    prices, ltps, lot_sizes, net_quantities = [], [], [], []
+    index = instrument_refresher.index
+    for key, exchange, symbol, direction in zip(keys, batch["exchange"], batch["symbol"], batch["direction"]):
+        quote = quotes.get(key)
+        try:
+            prices.append(limit_price(quote['depth'], direction))
+        except Exception:
+            prices.append(float("nan"))
+        ltps.append(quote["last_price"] if quote else float("nan"))
+        instrument = index.get(index.token(exchange, symbol) or 0)
+        lot_sizes.append(float(instrument["lot_size"]) if instrument else float("nan"))
+        net_quantities.append(position_cache.net_quantity(exchange, symbol))
+    batch["price"] = prices
+    batch["ltp"] = ltps
+    batch["lot_size"] = lot_sizes
+    batch["net_quantity"] = net_quantities
+    return batch
+
+
+def apply_sheet_config(config):
+    """
+    Pick up an access token that was rotated in the Info tab since the last cycle.
+    """
+    global access_token, sheet_access_token
+    cells = config.get(SPREADSHEET_ID) or []
+    token = cells[2] if len(cells) > 2 else None
+    # Only react to a change in the sheet, not to a token obtained by interactive login
+    if token and token != sheet_access_token:
+        sheet_access_token = token
+        kite.set_access_token(token)
+        access_token = token
+        logger.info("Access token updated from Google Sheet.")
+
+
+# Guards the risk check and each order placement. Pacing sleeps and status
+# writes happen outside it, so a slow sheet batch does not hold up orders
+# from the other intake backends.
+order_lock = threading.Lock()
+
+
+def process_batch(intake, batch):
+    """
+    Risk-check and place the pending orders of one intake batch.
+
+    Rejected orders get 'Risk_Rejected' and the reason; placed ones get
+    'Order_Placed', the timestamp and the limit price (D:F for sheet rows).
+    Each order is re-quoted at send time and its price rules checked again.
+    Orders the gate could not check for lack of data get 'Risk_Retry', which
+    is not a final status: sheet rows are checked again next cycle, senders
+    on the other backends resubmit. Backends that do not re-read pending
+    orders also get 'Order_Failed'.
+    """
+    if batch.config:
+        apply_sheet_config(batch.config)
+    if not batch.orders:
+        logger.info(f"No pending orders from {intake.name}: total={batch.total}, skipped={batch.skipped}, invalid={batch.invalid}")
+        return
+    with order_lock:
+        try:
+            position_cache.maybe_refresh()
+        except Exception as e:
+            logger.warning(f"Position refresh failed, checking against cached positions: {e}")
+        checked = risk_gate.evaluate(build_order_batch(batch.orders))
+        # Hold the allowed orders as pending right away, so batches from other
+        # backends checked while this one is being paced out see them
+        for order in checked[checked["allowed"]].itertuples():
+            row = batch.orders[order.ref]
+            position_cache.record_order(RESERVATION_PREFIX + row.correlation_id, order.exchange, row.symbol, row.direction,
+                                        row.quantity, price=order.price if pd.notna(order.price) else None,
+                                        token=get_instrument_token(order.exchange, row.symbol))
+
+    placed_count = 0
+    deferred = 0
+    rejected = []
+    for order in checked.itertuples():
+        row = batch.orders[order.ref]
+        # Every record for this row carries the same correlation id, plus order_id once known
+        with log_context(correlation_id=row.correlation_id, intake=intake.name, row=row.row, symbol=row.symbol):
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            if order.retry:
+                # Missing quote or lot size: not sent now, checked again on the next read
+                logger.warning(f"Risk check deferred {row.correlation_id}: {row.symbol} {row.direction} {row.quantity} - {order.reason}")
+                rejected.append((row, ["Risk_Retry", timestamp, order.reason]))
+                deferred += 1
                 continue
-            if status == "ORDER_PLACED":
-                skipped_count += 1
+            if not order.allowed:
+                logger.warning(f"Risk rejected {row.correlation_id}: {row.symbol} {row.direction} {row.quantity} - {order.reason}")
+                rejected.append((row, ["Risk_Rejected", timestamp, order.reason]))
                 continue
 
-            try:
-                quantity = int(float(quantity_str))
-            except Exception:
-                print(f"Invalid quantity at row {idx+1}: '{quantity_str}'")
+            # Re-quote right before sending, since later rows of a paced batch go
+            # out seconds after the batch quote, and check the new price again
+            fresh = price_gate.evaluate(build_order_batch([row])).iloc[0]
+            if not fresh.allowed:
+                position_cache.release_order(RESERVATION_PREFIX + row.correlation_id)
+                status = "Risk_Retry" if fresh.retry else "Risk_Rejected"
+                logger.warning(f"{status} at send {row.correlation_id}: {row.symbol} {row.direction} {row.quantity} - {fresh.reason}")
+                rejected.append((row, [status, timestamp, fresh.reason]))
+                deferred += bool(fresh.retry)
                 continue
 
             # Place the order
-            print(f"Placing order for row {idx+1}: {symbol} {direction} {quantity}", flush=True)
-            order_id, limit_price = place_order(symbol, direction, quantity)
+            logger.info(f"Placing order for {row.correlation_id}: {row.symbol} {row.direction} {row.quantity}")
+            price = float(fresh.price) if pd.notna(fresh.price) else None
+            with order_lock:
+                order_id, limit_price = place_order(row.symbol, row.direction, row.quantity,
+                                                    quote_cache=quote_cache, price=price)
+                # The broker order replaces the reservation (or, on failure, nothing does)
+                position_cache.release_order(RESERVATION_PREFIX + row.correlation_id)
+                if order_id:
+                    position_cache.record_order(order_id, order.exchange, row.symbol, row.direction, row.quantity,
+                                                price=limit_price, token=get_instrument_token(order.exchange, row.symbol))
 
             # On success, write status and timestamp
             if order_id:
-                row_num = idx + 1  # 1-based row in sheet
+                bind(order_id=order_id)
                 timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 try:
-                    # Update status, timestamp and limit price in a single call (D, E, F columns)
-                    sheet.update(range_name=f"D{row_num}:F{row_num}", values=[["Order_Placed", timestamp, limit_price]])
+                    # Mark the row right away so a restart never re-sends it (D, E, F columns)
+                    intake.mark(row, ["Order_Placed", timestamp, limit_price])
                     placed_count += 1
                 except Exception as e:
-                    print(f"Failed updating status for row {row_num}: {e}")
-            
+                    logger.error(f"Failed updating status for {row.correlation_id}: {e}")
+            elif not intake.rereads_pending:
+                try:
+                    intake.mark(row, ["Order_Failed", timestamp, ""])
+                except Exception as e:
+                    logger.error(f"Failed updating status for {row.correlation_id}: {e}")
+
             # Add a small delay between processing rows
-            time.sleep(1)
-        total_rows = len(rows) - 1
-        print(f"Cycle done: total={total_rows}, placed={placed_count}, skipped={skipped_count}, invalid={invalid_count}", flush=True)
+            time.sleep(intake.row_delay)
+
+    if rejected:
+        try:
+            intake.mark_many(rejected)
+        except Exception as e:
+            logger.error(f"Failed updating status for rejected rows: {e}")
+    logger.info(f"Batch done ({intake.name}): total={batch.total}, placed={placed_count}, skipped={batch.skipped}, "
+                f"invalid={batch.invalid}, rejected={len(rejected) - deferred}, deferred={deferred}")
+
+
+def process_place_orders():
+    """
+    Read orders from every tab in SHEET_SOURCES and process rows without status.
+    Columns:
+      A: symbol, B: direction (BUY/SELL), C: quantity, D: status, E: timestamp
+    Starts from row 2 (row 1 is header). If D == 'Order_Placed' or 'Risk_Rejected', skip;
+    'Risk_Retry' rows are picked up again.
+    """
+    try:
+        logger.info("Polling order tabs...")
+        process_batch(sheet_intake, sheet_intake.poll())
     except Exception as e:
-        print(f"process_place_orders error: {e}", flush=True)
+        logger.error(f"process_place_orders error: {e}")
+
+
+# Extra low-latency order sources next to the sheet; None disables a backend.
+SPOOL_DIR = None  # e.g. "order_spool": write ".name.tmp" files, then rename them to .csv/.jsonl
+SOCKET_PATH = None  # e.g. "order_intake.sock": owner-only Unix socket
+SOCKET_TCP_ADDRESS = None  # e.g. ("127.0.0.1", 9010) instead of the Unix socket; any local process can connect
+# Shared secret socket clients send as their first line ("AUTH <token>")
+SOCKET_TOKEN = os.environ.get("ORDER_SOCKET_TOKEN")
+
+
+def build_intakes():
+    intakes = [sheet_intake]
+    if SPOOL_DIR:
+        intakes.append(SpoolIntake(SPOOL_DIR))
+    if SOCKET_TCP_ADDRESS:
+        intakes.append(SocketIntake(SOCKET_TOKEN, address=SOCKET_TCP_ADDRESS))
+    elif SOCKET_PATH:
+        intakes.append(SocketIntake(SOCKET_TOKEN, path=SOCKET_PATH))
+    return intakes
 
 
 if __name__ == "__main__":
-    print("Starting Place_Orders poller (runs every 10s)...", flush=True)
-    while True:
-        process_place_orders()
-        time.sleep(10)
+    intakes = build_intakes()
+    logger.info(f"Starting order intake: {', '.join(intake.name for intake in intakes)} (sheet polled every {sheet_intake.poll_interval}s)...")
+    workers = [threading.Thread(target=run_intake, args=(intake, process_batch), name=f"{intake.name}-intake", daemon=True)
+               for intake in intakes[1:]]
+    for worker in workers:
+        worker.start()
+    if STREAM_ORDER_UPDATES:
+        start_order_stream()
+    run_intake(sheet_intake, process_batch)